@@ -1,39 +1,948 @@
+import io
+import os
 import math
 import json
+import hashlib
+import mmap
+import struct
 import time
+import random
 import discord
 import logging
 import asyncio
-from discord.ext import tasks
-from typing import List, Optional
+import ssl
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional
 from datetime import datetime, timedelta, UTC
 
 try:
     import aiohttp
 except ImportError:
     import requests as reqs
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
     USING_AIOHTTP = False
 else:
     USING_AIOHTTP = True
 
+try:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+except ImportError:
+    HAS_MATPLOTLIB = False
+else:
+    HAS_MATPLOTLIB = True
+
 
 class JSONConfig:
     def __init__(self, file_name: str) -> None:
         self.file_name = file_name
-        with open(file_name) as conf:
-            self.config = json.load(conf)
-
-    def update(self, key: str, value):
-        self.config[key] = value
-        with open(self.file_name, "w") as conf:
-            json.dump(self.config, conf, indent=4)
+        self.config = self.read()
+        self.mtime = os.path.getmtime(file_name)
 
     def get(self, key: str, default=None):
         return self.config.get(key, default)
 
+    def read(self) -> dict:
+        with open(self.file_name) as conf:
+            return json.load(conf)
 
-class BanTracker:
+    async def reload(self) -> Optional[dict]:
+        # Only stat the file on the hot path, it is read and parsed when it actually changed
+        mtime = await asyncio.to_thread(os.path.getmtime, self.file_name)
+        if mtime == self.mtime:
+            return None
+        config = await asyncio.to_thread(self.read)
+        self.mtime = mtime
+        return config
+
+
+POSITIVE_SETTINGS = [
+    "max_concurrent_sends", "max_concurrent_webhooks", "webhook_timeout", "outbox_size", "broadcast_interval",
+    "poll_interval", "min_poll_interval", "max_poll_interval", "breaker_threshold", "breaker_base_delay",
+    "breaker_max_delay", "connect_timeout", "read_timeout", "total_timeout", "tick_deadline", "hedge_delay",
+    "config_reload_interval"
+]
+
+
+def is_positive_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+
+def validate_config(config) -> List[str]:
+    if not isinstance(config, dict):
+        return ["the config must be a JSON object"]
+
+    errors = []
+    if not isinstance(config.get("token"), str):
+        errors.append("token must be a string")
+    for key in POSITIVE_SETTINGS:
+        # An explicit null would reach the setting as is, only a missing key falls back to the default
+        if key in config and not is_positive_number(config[key]):
+            errors.append(f"{key} must be a positive number")
+    channels = config.get("channels", [])
+    if not isinstance(channels, list) or not all(isinstance(channel_id, int) for channel_id in channels):
+        errors.append("channels must be a list of channel IDs")
+    sources = config.get("sources", [])
+    if not isinstance(sources, list) or not all(isinstance(options, dict) for options in sources):
+        errors.append("sources must be a list of objects")
+    broadcast_channel = config.get("broadcast_channel")
+    if broadcast_channel is not None and (not isinstance(broadcast_channel, int) or isinstance(broadcast_channel, bool)):
+        errors.append("broadcast_channel must be a channel ID")
+    # Only compared once both are known to be numbers
+    if not errors and config.get("min_poll_interval", 10) > config.get("max_poll_interval", 120):
+        errors.append("min_poll_interval must not be larger than max_poll_interval")
+    return errors
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def parse_seconds(value, default: float) -> float:
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class DeliveryStats:
+    def __init__(self) -> None:
+        self.sent = 0
+        self.failed = 0
+        self.latencies = []
+        self.started = time.monotonic()
+        self.duration = 0.0
+
+    def record(self, latency: float):
+        self.sent += 1
+        self.latencies.append(latency)
+
+    def finish(self):
+        self.duration = time.monotonic() - self.started
+
+    def add_fields(self, embed: discord.Embed):
+        embed.add_field(name="📬 Last Delivery", value=f"{self.sent:,} sent, {self.failed:,} failed", inline=True)
+        if self.latencies:
+            p50 = percentile(self.latencies, 50) * 1000
+            p99 = percentile(self.latencies, 99) * 1000
+            embed.add_field(name="⏱️ Send Latency", value=f"p50 {p50:.0f}ms / p99 {p99:.0f}ms", inline=True)
+        embed.add_field(name="🕒 Delivery Time", value=f"{self.duration:.1f}s", inline=True)
+
+
+class WebhookError(Exception):
+    pass
+
+
+class WebhookGone(WebhookError):
+    pass
+
+
+class WebhookSink:
+    def __init__(self, max_concurrency: int = 100, max_retries: int = 3, timeout: float = 10) -> None:
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = None
+        self.blocked_until = {}
+        self.global_blocked_until = 0.0
+        self.rate_limited = 0
+        self.gone = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.session is not None
+
+    async def start(self):
+        if USING_AIOHTTP and self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.max_concurrency,
+                ttl_dns_cache=300,
+                keepalive_timeout=60
+            )
+            self.session = aiohttp.ClientSession(connector=connector, headers={"User-Agent": "H"})
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def client_timeout(self) -> "aiohttp.ClientTimeout":
+        # aiohttp's default allows 5 minutes, and one stalled webhook would hold up the whole delivery
+        return aiohttp.ClientTimeout(total=self.timeout)
+
+    async def wait_unblocked(self, url: str):
+        while True:
+            delay = max(self.blocked_until.get(url, 0.0), self.global_blocked_until) - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    async def send(self, url: str, content: str):
+        try:
+            await self.post(url, content)
+        except (aiohttp.ClientError, ValueError) as e:
+            raise WebhookError(str(e)) from e
+
+    async def post(self, url: str, content: str):
+        for _ in range(self.max_retries + 1):
+            await self.wait_unblocked(url)
+            async with self.semaphore:
+                async with self.session.post(url, json={"content": content}, timeout=self.client_timeout()) as resp:
+                    if resp.status == 429:
+                        # A 429 from Cloudflare rather than Discord comes with an HTML page instead of JSON
+                        try:
+                            data = await resp.json(content_type=None)
+                        except ValueError:
+                            data = None
+                        if not isinstance(data, dict):
+                            data = {}
+                        retry_after = parse_seconds(data.get("retry_after", resp.headers.get("Retry-After")), 1)
+                        self.rate_limited += 1
+                        if data.get("global"):
+                            self.global_blocked_until = time.monotonic() + retry_after
+                        else:
+                            self.blocked_until[url] = time.monotonic() + retry_after
+                        continue
+                    if resp.status == 404:
+                        self.gone.add(url)
+                        raise WebhookGone("Webhook no longer exists")
+                    if resp.status >= 400:
+                        raise WebhookError(f"{resp.status} {await resp.text()}")
+
+                    # Wait out an exhausted bucket up front instead of taking a 429 on the next send
+                    if resp.headers.get("X-RateLimit-Remaining") == "0":
+                        reset_after = parse_seconds(resp.headers.get("X-RateLimit-Reset-After"), 0)
+                        self.blocked_until[url] = time.monotonic() + reset_after
+                    else:
+                        self.blocked_until.pop(url, None)
+                    return
+        raise WebhookError(f"Still rate limited after {self.max_retries} retries")
+
+    async def delete(self, url: str):
+        if self.session:
+            async with self.session.delete(url, timeout=self.client_timeout()) as resp:
+                if resp.status >= 400 and resp.status != 404:
+                    raise WebhookError(f"{resp.status} {await resp.text()}")
+
+
+class FanOut:
+    def __init__(self, client: discord.Client, max_concurrency: int = 50, webhook_sink: Optional[WebhookSink] = None) -> None:
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.webhook_sink = webhook_sink
+        self.logger = logging.getLogger('discord')
+        self.last_stats = None
+
+    async def send_webhook(self, channel_id: int, url: str, messages: List[str], stats: DeliveryStats) -> List[str]:
+        for index, message in enumerate(messages):
+            sent_at = time.monotonic()
+            try:
+                await self.webhook_sink.send(url, message)
+            except WebhookGone:
+                self.logger.warning(f"Webhook for channel {channel_id} is gone, falling back to the bot")
+                return messages[index:]
+            except (WebhookError, asyncio.TimeoutError) as e:
+                self.logger.error(f"Failed to send to webhook of channel {channel_id}: {e}")
+                stats.failed += 1
+                return []
+            stats.record(time.monotonic() - sent_at)
+        return []
+
+    async def send_channel(self, channel_id: int, messages: List[str], stats: DeliveryStats, webhook_url: Optional[str] = None) -> bool:
+        # Webhooks have their own rate limits and do not count against the bot token
+        if webhook_url and self.webhook_sink and self.webhook_sink.enabled:
+            messages = await self.send_webhook(channel_id, webhook_url, messages, stats)
+            if not messages:
+                return True
+
+        channel = self.client.get_channel(channel_id)
+        if channel is None:
+            stats.failed += 1
+            return False
+
+        # Messages for one channel are sent in order while holding a single slot
+        async with self.semaphore:
+            try:
+                for message in messages:
+                    sent_at = time.monotonic()
+                    await channel.send(message)
+                    stats.record(time.monotonic() - sent_at)
+            except discord.Forbidden:
+                self.logger.warning(f"No permission to send to channel {channel_id}")
+                stats.failed += 1
+                return False
+            except discord.HTTPException as e:
+                self.logger.error(f"Failed to send to channel {channel_id}: {e}")
+                stats.failed += 1
+        return True
+
+    async def deliver(self, subscriptions: List["Subscription"], messages_for: Callable[["Subscription"], List[str]]) -> List[int]:
+        stats = DeliveryStats()
+        results = await asyncio.gather(
+            *(
+                self.send_channel(subscription.channel_id, messages_for(subscription), stats, subscription.webhook_url)
+                for subscription in subscriptions
+            )
+        )
+        stats.finish()
+        self.last_stats = stats
+        return [subscription.channel_id for subscription, ok in zip(subscriptions, results) if not ok]
+
+
+class BroadcastUnavailable(Exception):
+    pass
+
+
+class Broadcaster:
+    def __init__(self, client: discord.Client, channel_id: Optional[int] = None, min_interval: float = 360) -> None:
+        self.client = client
+        self.channel_id = channel_id
+        self.min_interval = min_interval
+        self.last_publish = None
+        self.pending = Outbox()
+        self.logger = logging.getLogger('discord')
+
+    @property
+    def enabled(self) -> bool:
+        return self.channel_id is not None
+
+    def channel(self) -> Optional[discord.TextChannel]:
+        channel = self.client.get_channel(self.channel_id)
+        if isinstance(channel, discord.TextChannel) and channel.is_news():
+            return channel
+        return None
+
+    def check_channel(self):
+        if self.enabled and self.channel() is None:
+            self.logger.error(f"Broadcast channel {self.channel_id} is not an announcement channel, broadcast mode disabled")
+            self.channel_id = None
+
+    async def wait_ready(self):
+        # Discord only allows 10 publishes per hour per channel, the outbox coalesces meanwhile
+        if self.last_publish is not None:
+            await asyncio.sleep(max(self.last_publish + self.min_interval - time.monotonic(), 0))
+
+    async def publish(self, messages: List[str]) -> bool:
+        channel = self.channel()
+        if channel is None:
+            self.logger.error(f"Broadcast channel {self.channel_id} is not an announcement channel")
+            return False
+
+        try:
+            for message in messages:
+                sent = await channel.send(message)
+                await sent.publish()
+        except discord.HTTPException as e:
+            self.logger.error(f"Failed to publish to broadcast channel {self.channel_id}: {e}")
+            return False
+        finally:
+            self.last_publish = time.monotonic()
+        return True
+
+    async def follower_webhooks(self, destination: discord.TextChannel) -> List[discord.Webhook]:
+        return [
+            webhook for webhook in await destination.webhooks()
+            if webhook.source_channel is not None and webhook.source_channel.id == self.channel_id
+        ]
+
+    async def follow(self, destination: discord.TextChannel) -> bool:
+        # The channel can be deleted or stop being an announcement channel after startup
+        channel = self.channel()
+        if channel is None:
+            raise BroadcastUnavailable(f"Broadcast channel {self.channel_id} is not an announcement channel")
+        if await self.follower_webhooks(destination):
+            return False
+        await channel.follow(destination=destination, reason="Subscribed to ban notifications")
+        return True
+
+    async def unfollow(self, destination: discord.TextChannel) -> bool:
+        webhooks = await self.follower_webhooks(destination)
+        for webhook in webhooks:
+            await webhook.delete(reason="Unsubscribed from ban notifications")
+        return bool(webhooks)
+
+
+class BanDelta:
+    def __init__(self, watchdog: int, staff: int, total_wd_tracked: int, total_staff_tracked: int) -> None:
+        self.watchdog = watchdog
+        self.staff = staff
+        self.total_wd_tracked = total_wd_tracked
+        self.total_staff_tracked = total_staff_tracked
+
+    def merge(self, other: "BanDelta"):
+        self.watchdog += other.watchdog
+        self.staff += other.staff
+        self.total_wd_tracked = other.total_wd_tracked
+        self.total_staff_tracked = other.total_staff_tracked
+
+    def messages(self) -> List[str]:
+        messages = []
+        if self.watchdog > 0:
+            plural = "s" if self.watchdog != 1 else ""
+            messages.append(f"🐶 Watchdog banned {self.watchdog} player{plural}! (Total tracked: {self.total_wd_tracked:,})")
+        if self.staff > 0:
+            plural = "s" if self.staff != 1 else ""
+            messages.append(f"👮 Staff banned {self.staff} player{plural}! (Total tracked: {self.total_staff_tracked:,})")
+        return messages
+
+
+class MessageBuilder:
+    def __init__(self, combine: bool = True) -> None:
+        self.combine = combine
+
+    def build(self, delta: BanDelta, split: bool = False) -> List[str]:
+        lines = delta.messages()
+        if split or not self.combine or not lines:
+            return lines
+        return ["\n".join(lines)]
+
+
+class Outbox:
+    def __init__(self, maxsize: int = 16) -> None:
+        self.maxsize = maxsize
+        self.pending = deque()
+        self.ready = asyncio.Event()
+        self.coalesced = 0
+
+    def put(self, delta: BanDelta):
+        # Never block the poller: once the outbox is full, fold into the newest entry
+        if len(self.pending) >= self.maxsize:
+            self.pending[-1].merge(delta)
+            self.coalesced += 1
+        else:
+            self.pending.append(delta)
+        self.ready.set()
+
+    async def get(self) -> BanDelta:
+        while not self.pending:
+            self.ready.clear()
+            await self.ready.wait()
+
+        # Everything that piled up while the last delivery ran goes out as one delta
+        delta = self.pending.popleft()
+        while self.pending:
+            delta.merge(self.pending.popleft())
+            self.coalesced += 1
+        return delta
+
+
+class Subscription:
+    def __init__(self, channel_id: int, guild_id: Optional[int] = None, split_messages: bool = False, webhook_url: Optional[str] = None) -> None:
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.split_messages = split_messages
+        self.webhook_url = webhook_url
+
+    def row(self) -> tuple:
+        return (self.channel_id, self.guild_id, int(self.split_messages), self.webhook_url)
+
+
+class SubscriptionRegistry:
     def __init__(self) -> None:
+        self.channels = {}
+        self.guilds = {}
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self.channels
+
+    def __len__(self) -> int:
+        return len(self.channels)
+
+    def __iter__(self):
+        return iter(self.channels.values())
+
+    def get(self, channel_id: int) -> Optional[Subscription]:
+        return self.channels.get(channel_id)
+
+    def snapshot(self) -> List[Subscription]:
+        return list(self.channels.values())
+
+    def in_guild(self, guild_id: int) -> set:
+        return self.guilds.get(guild_id, set())
+
+    def add(self, subscription: Subscription):
+        self.remove(subscription.channel_id)
+        self.channels[subscription.channel_id] = subscription
+        self.guilds.setdefault(subscription.guild_id, set()).add(subscription.channel_id)
+
+    def remove(self, channel_id: int) -> Optional[Subscription]:
+        subscription = self.channels.pop(channel_id, None)
+        if subscription is not None:
+            guild_channels = self.guilds.get(subscription.guild_id)
+            guild_channels.discard(channel_id)
+            if not guild_channels:
+                del self.guilds[subscription.guild_id]
+        return subscription
+
+    def remove_many(self, channel_ids) -> List[Subscription]:
+        removed = (self.remove(channel_id) for channel_id in channel_ids)
+        return [subscription for subscription in removed if subscription is not None]
+
+    def clear(self):
+        self.channels.clear()
+        self.guilds.clear()
+
+
+class SubscriptionStore:
+    def __init__(self, file_name: str) -> None:
+        self.file_name = file_name
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(file_name, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS subscriptions ("
+                "channel_id INTEGER PRIMARY KEY, "
+                "guild_id INTEGER, "
+                "split_messages INTEGER NOT NULL DEFAULT 0, "
+                "webhook_url TEXT)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS subscriptions_guild ON subscriptions (guild_id)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS command_syncs (guild_id INTEGER PRIMARY KEY, schema_hash TEXT NOT NULL)")
+
+    def execute(self, sql: str, *params):
+        with self.lock, self.db:
+            return self.db.execute(sql, params).fetchall()
+
+    def executemany(self, sql: str, rows):
+        with self.lock, self.db:
+            self.db.executemany(sql, rows)
+
+    def get_meta(self, key: str, default=None):
+        rows = self.execute("SELECT value FROM meta WHERE key = ?", key)
+        return rows[0][0] if rows else default
+
+    def set_meta(self, key: str, value: str):
+        self.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", key, value)
+
+    def load(self) -> List[Subscription]:
+        rows = self.execute("SELECT channel_id, guild_id, split_messages, webhook_url FROM subscriptions ORDER BY rowid")
+        return [Subscription(channel_id, guild_id, bool(split), url) for channel_id, guild_id, split, url in rows]
+
+    def migrate(self, rows: List[tuple]) -> bool:
+        if self.get_meta("json_migrated"):
+            return False
+        self.executemany(
+            "INSERT OR IGNORE INTO subscriptions (channel_id, guild_id, split_messages, webhook_url) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        self.set_meta("json_migrated", "1")
+        return True
+
+    async def add(self, subscription: Subscription):
+        await asyncio.to_thread(
+            self.execute,
+            "INSERT INTO subscriptions (channel_id, guild_id, split_messages, webhook_url) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (channel_id) DO UPDATE SET guild_id = excluded.guild_id, "
+            "split_messages = excluded.split_messages, webhook_url = excluded.webhook_url",
+            *subscription.row()
+        )
+
+    async def set_webhooks(self, webhooks: List[tuple]):
+        await asyncio.to_thread(
+            self.executemany, "UPDATE subscriptions SET webhook_url = ? WHERE channel_id = ?", webhooks
+        )
+
+    def load_state(self, key: str) -> Optional[dict]:
+        value = self.get_meta(key)
+        return json.loads(value) if value else None
+
+    async def save_state(self, key: str, state: dict):
+        await asyncio.to_thread(self.set_meta, key, json.dumps(state))
+
+    def load_sync_hashes(self) -> dict:
+        return dict(self.execute("SELECT guild_id, schema_hash FROM command_syncs"))
+
+    async def set_sync_hash(self, guild_id: int, schema_hash: str):
+        await asyncio.to_thread(
+            self.execute, "INSERT OR REPLACE INTO command_syncs (guild_id, schema_hash) VALUES (?, ?)", guild_id, schema_hash
+        )
+
+    async def remove_sync_hashes(self, guild_ids: List[int]):
+        await asyncio.to_thread(
+            self.executemany, "DELETE FROM command_syncs WHERE guild_id = ?", [(guild_id,) for guild_id in guild_ids]
+        )
+
+    async def remove(self, channel_ids: List[int]):
+        await asyncio.to_thread(
+            self.executemany, "DELETE FROM subscriptions WHERE channel_id = ?", [(channel_id,) for channel_id in channel_ids]
+        )
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+PUNISHMENT_STATS_URL = "https://api.plancke.io/hypixel/v1/punishmentStats"
+HISTORY_FIELDS = ["watchdog_total", "staff_total", "watchdog_lastMinute", "watchdog_rollingDaily", "staff_rollingDaily"]
+
+
+def sample_value(value) -> int:
+    # Custom http sources may report fields as strings, floats or not at all
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+class TimeSeries:
+    MAGIC = b"BTTS"
+    HEADER = struct.Struct("<4sIQ")
+    GROW_BY = 4096
+
+    def __init__(self, file_name: str, fields: List[str]) -> None:
+        self.file_name = file_name
+        self.fields = fields
+        self.record = struct.Struct("<d" + "q" * len(fields))
+        self.stamp = struct.Struct("<d")
+
+        if not os.path.exists(file_name) or os.path.getsize(file_name) < self.HEADER.size:
+            with open(file_name, "wb") as f:
+                f.write(self.HEADER.pack(self.MAGIC, len(fields), 0))
+                f.truncate(self.HEADER.size + self.record.size * self.GROW_BY)
+
+        self.file = open(file_name, "r+b")
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        magic, field_count, self.count = self.HEADER.unpack_from(self.map, 0)
+        if magic != self.MAGIC or field_count != len(fields):
+            raise ValueError(f"{file_name} is not a history file with {len(fields)} fields")
+
+    @property
+    def capacity(self) -> int:
+        return (len(self.map) - self.HEADER.size) // self.record.size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def offset(self, index: int) -> int:
+        return self.HEADER.size + index * self.record.size
+
+    def timestamp(self, index: int) -> float:
+        return self.stamp.unpack_from(self.map, self.offset(index))[0]
+
+    def get(self, index: int) -> tuple:
+        if index < 0:
+            index += self.count
+        return self.record.unpack_from(self.map, self.offset(index))
+
+    def last(self) -> Optional[tuple]:
+        return self.get(self.count - 1) if self.count else None
+
+    def set(self, index: int, timestamp: float, values):
+        self.record.pack_into(self.map, self.offset(index), timestamp, *values)
+
+    def remap(self, size: int):
+        self.map.close()
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+    def append(self, timestamp: float, values):
+        if self.count and timestamp < self.timestamp(self.count - 1):
+            timestamp = self.timestamp(self.count - 1)
+        if self.count >= self.capacity:
+            self.remap(self.offset(self.count + self.GROW_BY))
+
+        # The record is written before the count so a crash never exposes a half-written sample
+        self.set(self.count, timestamp, values)
+        self.count += 1
+        self.HEADER.pack_into(self.map, 0, self.MAGIC, len(self.fields), self.count)
+
+    def truncate_before(self, timestamp: float) -> int:
+        index = self.bisect(timestamp)
+        if index:
+            remaining = self.count - index
+            self.map.move(self.offset(0), self.offset(index), remaining * self.record.size)
+            self.count = remaining
+            self.HEADER.pack_into(self.map, 0, self.MAGIC, len(self.fields), self.count)
+        return index
+
+    def bisect(self, timestamp: float) -> int:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def range(self, start: float, end: float) -> List[tuple]:
+        return [self.get(index) for index in range(self.bisect(start), self.bisect(end))]
+
+    def flush(self):
+        self.map.flush()
+
+    def close(self):
+        if not self.map.closed:
+            self.map.flush()
+            self.map.close()
+            self.file.close()
+
+
+class RollupTier:
+    FIELDS = ["watchdog", "staff", "watchdog_cumulative", "staff_cumulative"]
+
+    def __init__(self, file_name: str, resolution: int, retention: Optional[float] = None) -> None:
+        self.series = TimeSeries(file_name, self.FIELDS)
+        self.resolution = resolution
+        self.retention = retention
+
+    def add(self, timestamp: float, watchdog: int, staff: int):
+        bucket = timestamp - timestamp % self.resolution
+        last = self.series.last()
+        if last is not None and bucket < last[0]:
+            # The clock stepped back across a boundary, a second row for an old bucket would break the ordering
+            bucket = last[0]
+        if last is not None and last[0] == bucket:
+            _, wd, st, wd_cum, st_cum = last
+            self.series.set(len(self.series) - 1, bucket, (wd + watchdog, st + staff, wd_cum + watchdog, st_cum + staff))
+        else:
+            wd_cum, st_cum = (last[3], last[4]) if last is not None else (0, 0)
+            self.series.append(bucket, (watchdog, staff, wd_cum + watchdog, st_cum + staff))
+
+    @property
+    def name(self) -> str:
+        return {60: "minute", 3600: "hour", 86400: "day"}.get(self.resolution, f"{self.resolution}s")
+
+    def oldest(self) -> Optional[float]:
+        return self.series.timestamp(0) if len(self.series) else None
+
+    def covers(self, start: float, end: float) -> bool:
+        # Compaction only drops buckets older than the retention, anything newer that is missing never happened
+        oldest = self.oldest()
+        return oldest is not None and (oldest <= start or self.retention is None or start >= end - self.retention)
+
+    def sum(self, start: float, end: float) -> tuple:
+        # Running totals turn any window into two lookups, whatever its length
+        first, last = self.series.bisect(start), self.series.bisect(end) - 1
+        watchdog = staff = 0
+        if last >= first:
+            _, first_wd, first_st, first_wd_cum, first_st_cum = self.series.get(first)
+            _, _, _, last_wd_cum, last_st_cum = self.series.get(last)
+            watchdog, staff = last_wd_cum - first_wd_cum + first_wd, last_st_cum - first_st_cum + first_st
+
+        # The bucket that starts before the window only partly falls into it, count its share
+        if first > 0:
+            timestamp, wd, st, _, _ = self.series.get(first - 1)
+            share = (min(timestamp + self.resolution, end) - start) / self.resolution
+            if share > 0:
+                watchdog += round(wd * share)
+                staff += round(st * share)
+        return watchdog, staff
+
+    def buckets(self, start: float, end: float) -> List[tuple]:
+        return [(timestamp, wd, st) for timestamp, wd, st, _, _ in self.series.range(start, end)]
+
+    def compact(self, now: float):
+        if self.retention is not None and len(self.series) and now - self.oldest() > self.retention * 1.1:
+            self.series.truncate_before(now - self.retention)
+
+    def close(self):
+        self.series.close()
+
+
+class BanHistory:
+    def __init__(self, file_name: str, raw_retention: float = 7 * 86400, minute_retention: float = 90 * 86400) -> None:
+        root, ext = os.path.splitext(file_name)
+        self.samples = TimeSeries(file_name, HISTORY_FIELDS)
+        self.raw_retention = raw_retention
+        self.tiers = [
+            RollupTier(f"{root}.minute{ext}", 60, minute_retention),
+            RollupTier(f"{root}.hour{ext}", 3600),
+            RollupTier(f"{root}.day{ext}", 86400)
+        ]
+
+    def record(self, timestamp: float, record: dict, watchdog: int, staff: int):
+        # The rollups go first, they are what the counts are answered from
+        for tier in self.tiers:
+            tier.add(timestamp, watchdog, staff)
+        self.samples.append(timestamp, [sample_value(record.get(field)) for field in HISTORY_FIELDS])
+
+        # Raw samples past their retention are already summed up in the rollup tiers
+        if len(self.samples) and timestamp - self.samples.timestamp(0) > self.raw_retention * 1.1:
+            self.samples.truncate_before(timestamp - self.raw_retention)
+        for tier in self.tiers:
+            tier.compact(timestamp)
+
+    def tier_for(self, start: float, end: float) -> RollupTier:
+        # The finest tier that still holds the whole window, so the partial bucket at the start is smallest
+        for tier in self.tiers:
+            if tier.covers(start, end):
+                return tier
+        return self.tiers[0]
+
+    def count(self, start: float, end: float) -> tuple:
+        return self.tier_for(start, end).sum(start, end)
+
+    def chart_tier(self, start: float, end: float, max_points: int = 500) -> RollupTier:
+        for tier in self.tiers:
+            if tier.covers(start, end) and (end - start) / tier.resolution <= max_points:
+                return tier
+        return self.tiers[-1]
+
+    def close(self):
+        self.samples.close()
+        for tier in self.tiers:
+            tier.close()
+
+
+def render_chart(buckets: List[tuple], title: str) -> bytes:
+    times = [datetime.fromtimestamp(timestamp, UTC) for timestamp, _, _ in buckets]
+    figure, axes = plt.subplots(figsize=(8, 3), dpi=100)
+    axes.plot(times, [wd for _, wd, _ in buckets], label="Watchdog", color="#e67e22")
+    axes.plot(times, [staff for _, _, staff in buckets], label="Staff", color="#3498db")
+    axes.set_title(title)
+    axes.set_ylabel("Bans")
+    axes.legend(loc="upper left")
+    figure.autofmt_xdate()
+    figure.tight_layout()
+    
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png")
+    plt.close(figure)
+    return buffer.getvalue()
+
+
+class ChartRenderer:
+    def __init__(self, max_workers: int = 1, max_cached: int = 32) -> None:
+        self.max_workers = max_workers
+        self.max_cached = max_cached
+        self.executor = None
+        self.cache = OrderedDict()
+
+    @property
+    def available(self) -> bool:
+        return HAS_MATPLOTLIB
+
+    async def render(self, key: tuple, buckets: List[tuple], title: str) -> bytes:
+        # Concurrent requests for the same chart all wait on the one render
+        future = self.cache.get(key)
+        if future is None:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            future = asyncio.get_running_loop().run_in_executor(self.executor, render_chart, buckets, title)
+            self.cache[key] = future
+            while len(self.cache) > self.max_cached:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(key)
+
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            if self.cache.get(key) is future:
+                del self.cache[key]
+            raise
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PunishmentSource(ABC):
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.latencies = deque(maxlen=100)
+
+    def p95(self) -> Optional[float]:
+        return percentile(list(self.latencies), 95)
+
+    @abstractmethod
+    async def fetch(self, tracker: "BanTracker") -> dict:
+        pass
+
+    @abstractmethod
+    async def probe(self, tracker: "BanTracker") -> bool:
+        pass
+
+
+class HttpSource(PunishmentSource):
+    def __init__(self, url: str, name: Optional[str] = None, headers: Optional[dict] = None,
+                 record_key: Optional[str] = "record") -> None:
+        super().__init__(name or url)
+        self.url = url
+        self.headers = headers or {}
+        self.record_key = record_key
+
+    def extract(self, data: dict) -> Optional[dict]:
+        return data.get(self.record_key) if self.record_key else data
+
+    async def fetch(self, tracker: "BanTracker") -> dict:
+        record = self.extract(await tracker.get_json(self.url, self.headers))
+        if not record or "watchdog_total" not in record or "staff_total" not in record:
+            raise ValueError(f"{self.name} returned no punishment stats")
+        return record
+
+    async def probe(self, tracker: "BanTracker") -> bool:
+        return await tracker.head(self.url, self.headers) < 500
+
+
+class PlanckeSource(HttpSource):
+    def __init__(self) -> None:
+        super().__init__(PUNISHMENT_STATS_URL, "plancke")
+
+
+class HypixelSource(HttpSource):
+    def __init__(self, api_key: str) -> None:
+        super().__init__("https://api.hypixel.net/punishmentstats", "hypixel", {"API-Key": api_key}, None)
+
+    def extract(self, data: dict) -> Optional[dict]:
+        return data if data.get("success") else None
+
+
+class FileSource(PunishmentSource):
+    def __init__(self, path: str, record_key: Optional[str] = "record") -> None:
+        super().__init__(f"file:{path}")
+        self.path = path
+        self.record_key = record_key
+
+    def read(self) -> dict:
+        with open(self.path) as f:
+            data = json.load(f)
+        return data.get(self.record_key) if self.record_key else data
+
+    async def fetch(self, tracker: "BanTracker") -> dict:
+        record = await asyncio.to_thread(self.read)
+        if not record or "watchdog_total" not in record or "staff_total" not in record:
+            raise ValueError(f"{self.path} holds no punishment stats")
+        return record
+
+    async def probe(self, tracker: "BanTracker") -> bool:
+        return os.path.exists(self.path)
+
+
+def build_source(options: dict) -> PunishmentSource:
+    kind = options.get("type", "plancke")
+    if kind == "plancke":
+        return PlanckeSource()
+    if kind == "hypixel":
+        return HypixelSource(options["api_key"])
+    if kind == "http":
+        return HttpSource(options["url"], options.get("name"), options.get("headers"), options.get("record_key", "record"))
+    if kind == "file":
+        return FileSource(options["path"], options.get("record_key", "record"))
+    raise ValueError(f"Unknown source type: {kind}")
+
+
+class BanTracker:
+    def __init__(self, history: Optional[BanHistory] = None, connect_timeout: float = 5, read_timeout: float = 10,
+                 total_timeout: float = 15, tick_deadline: float = 20, keepalive: float = 150,
+                 pool_size: int = 10, shared_ssl_context: bool = True, fetch_threads: int = 2,
+                 sources: Optional[List[PunishmentSource]] = None, hedge: bool = False, hedge_delay: float = 2) -> None:
         self.owd_bans = None
         self.ostaff_bans = None
         self.total_wd_tracked = 0
@@ -41,65 +950,214 @@ class BanTracker:
         self.start_time = time.time()
         self.last_fetch_time = None
         self.consecutive_errors = 0
+        self.timeouts = 0
+        self.history = history
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.tick_deadline = tick_deadline
+        self.keepalive = keepalive
+        self.pool_size = pool_size
+        self.ssl_context = ssl.create_default_context() if shared_ssl_context else None
+        self.connections = {"new": 0, "reused": 0, "dns_hits": 0, "dns_misses": 0}
+        self.sources = sources or [PlanckeSource()]
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedges = 0
+        self.last_source = None
         
         if USING_AIOHTTP:
             self.session = None
+            self.executor = None
         else:
+            # Sync fetches get their own threads so they never starve other to_thread users
+            self.executor = ThreadPoolExecutor(max_workers=fetch_threads, thread_name_prefix="bantracker-fetch")
+            adapter = HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=["GET", "HEAD"])
+            )
             self.session = reqs.Session()
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
             self.session.headers.update({"User-Agent": "H"})
 
+    def snapshot(self) -> dict:
+        return {
+            "owd_bans": self.owd_bans,
+            "ostaff_bans": self.ostaff_bans,
+            "total_wd_tracked": self.total_wd_tracked,
+            "total_staff_tracked": self.total_staff_tracked,
+            "last_fetch_time": self.last_fetch_time
+        }
+
+    def restore(self, state: dict):
+        self.owd_bans = state.get("owd_bans")
+        self.ostaff_bans = state.get("ostaff_bans")
+        self.total_wd_tracked = state.get("total_wd_tracked", 0)
+        self.total_staff_tracked = state.get("total_staff_tracked", 0)
+        self.last_fetch_time = state.get("last_fetch_time")
+
+    def trace_config(self) -> "aiohttp.TraceConfig":
+        trace = aiohttp.TraceConfig()
+
+        def counter(key: str):
+            async def count(session, context, params):
+                self.connections[key] += 1
+            return count
+
+        trace.on_connection_create_end.append(counter("new"))
+        trace.on_connection_reuseconn.append(counter("reused"))
+        trace.on_dns_cache_hit.append(counter("dns_hits"))
+        trace.on_dns_cache_miss.append(counter("dns_misses"))
+        return trace
+
+    def client_timeout(self) -> "aiohttp.ClientTimeout":
+        return aiohttp.ClientTimeout(total=self.total_timeout, connect=self.connect_timeout, sock_read=self.read_timeout)
+
     async def init_session(self):
         if USING_AIOHTTP and self.session is None:
+            # Keep the connection open across polls so each fetch skips DNS, TCP and TLS setup
+            connector_options = {}
+            if self.ssl_context is not None:
+                connector_options["ssl"] = self.ssl_context
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                ttl_dns_cache=max(self.keepalive, 300),
+                keepalive_timeout=self.keepalive,
+                **connector_options
+            )
             self.session = aiohttp.ClientSession(
-                headers={"User-Agent": "H"}
+                connector=connector,
+                trace_configs=[self.trace_config()],
+                headers={"User-Agent": "H"},
+                timeout=self.client_timeout()
             )
 
     async def close_session(self):
         if USING_AIOHTTP and self.session:
             await self.session.close()
+        elif not USING_AIOHTTP:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.session.close()
+
+    async def run_sync(self, function: Callable, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, lambda: function(*args, **kwargs)
+        )
 
-    async def check_bans(self):
+    async def get_json(self, url: str, headers: Optional[dict] = None) -> dict:
+        if USING_AIOHTTP:
+            async with self.session.get(url, headers=headers, timeout=self.client_timeout()) as resp:
+                resp.raise_for_status()
+                return await resp.json()
+        
+        def get():
+            resp = self.session.get(url, headers=headers, timeout=(self.connect_timeout, self.read_timeout))
+            resp.raise_for_status()
+            return resp.json()
+        
         try:
-            if USING_AIOHTTP:
-                async with self.session.get('https://api.plancke.io/hypixel/v1/punishmentStats') as resp:
-                    data = await resp.json()
-            else:
-                data = await asyncio.to_thread(
-                    lambda: self.session.get('https://api.plancke.io/hypixel/v1/punishmentStats').json()
-                )
+            return await self.run_sync(get)
+        except reqs.Timeout as e:
+            raise asyncio.TimeoutError() from e
+
+    async def head(self, url: str, headers: Optional[dict] = None) -> int:
+        if USING_AIOHTTP:
+            async with self.session.head(url, headers=headers, timeout=self.client_timeout()) as resp:
+                return resp.status
+        resp = await self.run_sync(
+            self.session.head, url, headers=headers, timeout=(self.connect_timeout, self.read_timeout)
+        )
+        return resp.status_code
+
+    async def probe(self) -> bool:
+        try:
+            return await self.sources[0].probe(self)
+        except Exception as e:
+            logging.getLogger('discord').warning(f"Upstream probe failed: {e}")
+            return False
+
+    async def fetch_from(self, source: PunishmentSource) -> tuple:
+        started = time.monotonic()
+        record = await source.fetch(self)
+        source.latencies.append(time.monotonic() - started)
+        return source, record
+
+    async def fetch_hedged(self) -> tuple:
+        primary, backup = self.sources[0], self.sources[1]
+        tasks = [asyncio.create_task(self.fetch_from(primary))]
+        try:
+            # Only hedge when the primary is slower than it usually is, or already failed
+            done, _ = await asyncio.wait(tasks, timeout=max(primary.p95() or 0, self.hedge_delay))
+            if done and tasks[0].exception() is None:
+                return tasks[0].result()
             
-            curr_stats = data.get('record')
-            if not curr_stats:
-                return []
+            self.hedges += 1
+            tasks.append(asyncio.create_task(self.fetch_from(backup)))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def fetch(self) -> dict:
+        if self.hedge and len(self.sources) > 1:
+            source, record = await self.fetch_hedged()
+        else:
+            source, record = await self.fetch_from(self.sources[0])
+        self.last_source = source.name
+        return record
+
+    async def check_bans(self) -> Optional[BanDelta]:
+        try:
+            # A hung connection must never stall the tick, whatever the socket timeouts say
+            curr_stats = await asyncio.wait_for(self.fetch(), self.tick_deadline)
             
             wd_bans = curr_stats.get("watchdog_total")
             staff_bans = curr_stats.get("staff_total")
             self.last_fetch_time = time.time()
             self.consecutive_errors = 0
-            embeds = []
+            delta = None
+            wban_dif = sban_dif = 0
 
             if self.owd_bans is not None and self.ostaff_bans is not None:
-                wban_dif = wd_bans - self.owd_bans
-                sban_dif = staff_bans - self.ostaff_bans
-
-                if wban_dif > 0:
-                    self.total_wd_tracked += wban_dif
-                    plural = "s" if wban_dif != 1 else ""
-                    embeds.append(f"🐶 Watchdog banned {wban_dif} player{plural}! (Total tracked: {self.total_wd_tracked:,})")
-
-                if sban_dif > 0:
-                    self.total_staff_tracked += sban_dif
-                    plural = "s" if sban_dif != 1 else ""
-                    embeds.append(f"👮 Staff banned {sban_dif} player{plural}! (Total tracked: {self.total_staff_tracked:,})")
-
-            self.owd_bans = wd_bans
-            self.ostaff_bans = staff_bans
-            return embeds
+                wban_dif = max(wd_bans - self.owd_bans, 0)
+                sban_dif = max(staff_bans - self.ostaff_bans, 0)
+                self.total_wd_tracked += wban_dif
+                self.total_staff_tracked += sban_dif
+
+                if wban_dif > 0 or sban_dif > 0:
+                    delta = BanDelta(wban_dif, sban_dif, self.total_wd_tracked, self.total_staff_tracked)
+
+            # Sources can lag each other, so a lower total is stale rather than a baseline to count from
+            self.owd_bans = max(wd_bans, self.owd_bans or 0)
+            self.ostaff_bans = max(staff_bans, self.ostaff_bans or 0)
+
+            # The bans are counted by now, a history that cannot be written must not count them again
+            if self.history is not None:
+                try:
+                    self.history.record(self.last_fetch_time, curr_stats, wban_dif, sban_dif)
+                except Exception as e:
+                    logging.getLogger('discord').error(f"Failed to record ban history: {e}")
+            return delta
             
+        except asyncio.TimeoutError:
+            self.consecutive_errors += 1
+            self.timeouts += 1
+            logging.getLogger('discord').error(f"Timed out fetching ban data after {self.tick_deadline}s")
+            return None
         except Exception as e:
             self.consecutive_errors += 1
             logging.getLogger('discord').error(f"Error fetching ban data: {e}")
-            return []
+            return None
 
     def get_stats_embed(self) -> discord.Embed:
         uptime = time.time() - self.start_time
@@ -119,53 +1177,433 @@ class BanTracker:
             last_check = f"<t:{math.floor(self.last_fetch_time)}:R>"
             embed.add_field(name="🔄 Last Check", value=last_check, inline=True)
         
+        if self.connections["new"] or self.connections["reused"]:
+            embed.add_field(
+                name="🔗 Connections",
+                value=f"{self.connections['reused']:,} reused / {self.connections['new']:,} new",
+                inline=True
+            )
+        
+        if self.last_source and len(self.sources) > 1:
+            value = self.last_source + (f", {self.hedges:,} hedged" if self.hedges else "")
+            embed.add_field(name="🛰️ Source", value=value, inline=True)
+        
+        if self.timeouts:
+            embed.add_field(name="⌛ Fetch Timeouts", value=f"{self.timeouts:,}", inline=True)
+        
         if self.owd_bans and self.ostaff_bans:
             embed.add_field(name="🎯 Current Total Bans", value=f"{self.owd_bans + self.ostaff_bans:,}", inline=True)
         
+        if self.history is not None:
+            now = time.time()
+            for name, seconds in (("🕐 Last Hour", 3600), ("📅 Last 24 Hours", 86400)):
+                wd, staff = self.history.count(now - seconds, now)
+                embed.add_field(name=name, value=f"🐶 {wd:,} / 👮 {staff:,}", inline=True)
+        
+        return embed
+
+    def get_history_embed(self, seconds: int, label: str) -> discord.Embed:
+        end = time.time()
+        start = end - seconds
+        wd, staff = self.history.count(start, end)
+        
+        embed = discord.Embed(
+            title=f"📜 Bans in the {label}",
+            color=discord.Color.blue(),
+            timestamp=datetime.now(UTC)
+        )
+        embed.add_field(name="🐶 Watchdog", value=f"{wd:,}", inline=True)
+        embed.add_field(name="👮 Staff", value=f"{staff:,}", inline=True)
+        embed.add_field(name="📈 Total", value=f"{wd + staff:,}", inline=True)
+        
+        # A window reaching back past the first sample is only rated over the time actually tracked
+        oldest = self.history.tier_for(start, end).oldest()
+        tracked = end - max(start, oldest) if oldest is not None else 0
+        if tracked > 0:
+            embed.add_field(name="⏱️ Per Hour", value=f"{(wd + staff) * 3600 / tracked:,.1f}", inline=True)
+        if oldest is None or oldest > start:
+            embed.set_footer(text="Tracking started within this window" if oldest is not None else "No bans tracked yet")
+        
         return embed
 
 
+class PollScheduler:
+    # Upstream refresh periods past this are not searched, it keeps a refit to a few milliseconds
+    MAX_PERIOD = 300
+    MIN_WINDOWS = 30
+    MIN_UNCHANGED = 5
+    REFIT_EVERY = 5
+    PROBE_EVERY = 5
+
+    def __init__(self, interval: float = 30, min_interval: float = 10, max_interval: float = 120,
+                 jitter: float = 2, adaptive: bool = True) -> None:
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.adaptive = adaptive
+        self.windows = deque(maxlen=240)
+        self.period = None
+        self.phase = None
+        self.spread = None
+        self.last_fetch = None
+        self.ticks = 0
+        self.unchanged_streak = 0
+        self.average_bans = None
+        self.wave = False
+
+    def fit_period(self, period: int) -> tuple:
+        # Log-likelihood of each refresh second (mod period): changed windows must contain a refresh and
+        # unchanged ones should not, though a refresh without new bans is far likelier than the reverse
+        miss_changed, miss_unchanged = math.log(0.02), math.log(0.2)
+        base = 0.0
+        coverage = [0.0] * (period + 1)
+        for start, end, changed in self.windows:
+            # Round outwards for changed windows and inwards for unchanged ones, so a refresh in the
+            # same second as a fetch is never held against the right phase
+            if changed:
+                first, length = math.floor(start), math.ceil(end) - math.floor(start)
+            else:
+                first, length = math.ceil(start), math.floor(end) - math.ceil(start)
+                if length <= 0:
+                    continue
+            if length >= period:
+                # Such a window holds a refresh wherever the phase is, it only says anything when unchanged
+                if not changed:
+                    base += miss_unchanged
+                continue
+
+            if changed:
+                base += miss_changed
+                weight = -miss_changed
+            else:
+                weight = miss_unchanged
+
+            first %= period
+            coverage[first] += weight
+            if first + length <= period:
+                coverage[first + length] -= weight
+            else:
+                coverage[period] -= weight
+                coverage[0] += weight
+                coverage[first + length - period] -= weight
+
+        scores, running = [], base
+        for second in range(period):
+            running += coverage[second]
+            scores.append(running)
+        best_score = max(scores)
+        best = [second for second in range(period) if scores[second] >= best_score - 1e-9]
+
+        # The smallest arc holding every best second is how well the refresh is pinned down
+        gaps = [(best[(index + 1) % len(best)] - second) % period or period for index, second in enumerate(best)]
+        widest = max(range(len(best)), key=gaps.__getitem__)
+        # The refresh can be as late as the end of that arc, so aim just past it
+        return best_score, (best[widest] + 1) % period, period - gaps[widest] + 1
+
+    def fit(self):
+        current, self.period, self.phase, self.spread = self.period, None, None, None
+        # Without fetches that came back unchanged the upstream refreshes at least as often as it is polled
+        if len(self.windows) < self.MIN_WINDOWS or sum(not changed for _, _, changed in self.windows) < self.MIN_UNCHANGED:
+            return
+
+        fits = []
+        for period in range(max(int(self.min_interval), 2), min(int(self.max_interval), self.MAX_PERIOD) + 1):
+            score, phase, spread = self.fit_period(period)
+            fits.append((score, period, phase, spread))
+
+        # A longer period has more room to explain the same windows by chance, so take the shortest that
+        # fits about as well as the best. Fetches aimed at the current period test its neighbours less, so
+        # it is kept until another one fits clearly better
+        best_score = max(score for score, _, _, _ in fits)
+        close = [fit for fit in fits if fit[0] >= best_score - 1]
+        kept = [fit for fit in fits if fit[1] == current and fit[0] >= best_score - 4]
+        _, period, phase, spread = (kept or close)[0]
+        if spread <= period / 2:
+            self.period, self.phase, self.spread = period, phase, spread
+
+    def observe(self, fetch_time: float, changed: bool, bans: int):
+        if self.last_fetch is not None and self.adaptive:
+            self.windows.append((self.last_fetch, fetch_time, changed))
+            self.ticks += 1
+            if self.ticks % self.REFIT_EVERY == 0:
+                self.fit()
+        self.last_fetch = fetch_time
+
+        if changed:
+            self.unchanged_streak = 0
+            self.wave = self.average_bans is not None and bans >= max(3 * self.average_bans, 5)
+            self.average_bans = bans if self.average_bans is None else 0.9 * self.average_bans + 0.1 * bans
+        else:
+            self.unchanged_streak += 1
+            self.wave = False
+
+    def next_delay(self, now: float) -> float:
+        if not self.adaptive:
+            return self.interval
+
+        if self.wave:
+            delay = self.min_interval
+        elif self.unchanged_streak > 2:
+            delay = min(self.interval * 2 ** (self.unchanged_streak - 2), self.max_interval)
+        else:
+            delay = self.interval
+
+        # Pull the fetch in to just after the last refresh expected before it. A fetch is never pushed back,
+        # so a fit that is off costs no more latency than not aiming at all
+        if self.phase is not None and not self.wave:
+            refresh = self.phase + math.floor((now + delay - self.phase) / self.period) * self.period
+            # Aiming only beats fixed polling once the refresh is pinned down closely. Until then, and every
+            # few ticks after, fetch in the middle of the span it falls in to narrow that span down
+            if self.spread + 2 > min(self.interval, self.period) / 2 or self.ticks % self.PROBE_EVERY == 0:
+                refresh -= self.spread / 2
+            if refresh - now >= self.min_interval:
+                delay = refresh - now
+
+        return max(delay, self.min_interval) + random.uniform(0, self.jitter)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, threshold: int = 3, base_delay: float = 30, max_delay: float = 900) -> None:
+        self.threshold = threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = self.CLOSED
+        self.trips = 0
+        self.retry_at = 0.0
+        self.logger = logging.getLogger('discord')
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() >= self.retry_at:
+            self.state = self.HALF_OPEN
+        return self.state != self.OPEN
+
+    def record(self, consecutive_errors: int):
+        if consecutive_errors == 0:
+            if self.state != self.CLOSED:
+                self.logger.info(f"Upstream recovered, closing circuit after {self.trips} trip(s)")
+            self.state = self.CLOSED
+            self.trips = 0
+        elif self.state == self.HALF_OPEN or consecutive_errors >= self.threshold:
+            self.trip(consecutive_errors)
+
+    def trip(self, consecutive_errors: int):
+        self.trips += 1
+        # Equal jitter spreads the retries of every instance out but still waits at least half the backoff
+        backoff = min(self.base_delay * 2 ** (self.trips - 1), self.max_delay)
+        delay = backoff / 2 + random.uniform(0, backoff / 2)
+        self.retry_at = time.monotonic() + delay
+        self.state = self.OPEN
+        self.logger.warning(f"Upstream failed {consecutive_errors} time(s) in a row, pausing fetches for {delay:.0f}s")
+
+    def add_fields(self, embed: discord.Embed, consecutive_errors: int):
+        value = self.state.capitalize()
+        if self.state == self.OPEN:
+            value += f", retry <t:{math.floor(time.time() + self.retry_at - time.monotonic())}:R>"
+        if consecutive_errors:
+            value += f" ({consecutive_errors} error{'s' if consecutive_errors != 1 else ''})"
+        embed.add_field(name="🔌 Upstream", value=value, inline=True)
+
+
+class TickClock:
+    def __init__(self) -> None:
+        self.deadline = None
+        self.lag = 0.0
+        self.lags = deque(maxlen=120)
+        self.skipped = 0
+
+    def wall_deadline(self) -> float:
+        return time.time() - (time.monotonic() - self.deadline)
+
+    async def wait(self, period: float):
+        # Deadlines follow each other by exactly one period, however long the last tick took
+        now = time.monotonic()
+        if self.deadline is None:
+            self.deadline = now
+        else:
+            self.deadline += period
+
+        if self.deadline < now:
+            missed = int((now - self.deadline) // period)
+            if missed:
+                self.skipped += missed
+                self.deadline += missed * period
+                logging.getLogger('discord').warning(f"Skipped {missed} missed tick(s), running late by {now - self.deadline:.1f}s")
+        else:
+            await asyncio.sleep(self.deadline - now)
+
+        self.lag = time.monotonic() - self.deadline
+        self.lags.append(self.lag)
+
+    def add_fields(self, embed: discord.Embed):
+        p99 = percentile(list(self.lags), 99) or 0.0
+        value = f"{self.lag * 1000:.0f}ms (p99 {p99 * 1000:.0f}ms)"
+        if self.skipped:
+            value += f", {self.skipped:,} skipped"
+        embed.add_field(name="⏲️ Tick Lag", value=value, inline=True)
+
+
+class StatsCache:
+    def __init__(self, build: Callable[[], discord.Embed], start_time: float) -> None:
+        self.build = build
+        self.start_time = start_time
+        self.payload = None
+        self.uptime_index = None
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        self.payload = None
+
+    def get(self) -> discord.Embed:
+        if self.payload is None:
+            self.misses += 1
+            self.payload = self.build().to_dict()
+            self.uptime_index = next(
+                (index for index, field in enumerate(self.payload.get("fields", [])) if field["name"] == "⏰ Uptime"),
+                None
+            )
+        else:
+            self.hits += 1
+
+        # Only the uptime field and the footer change between ticks, everything else is shared
+        payload = dict(self.payload)
+        if self.uptime_index is not None:
+            payload["fields"] = list(payload["fields"])
+            payload["fields"][self.uptime_index] = dict(
+                payload["fields"][self.uptime_index],
+                value=str(timedelta(seconds=int(time.time() - self.start_time)))
+            )
+        payload["footer"] = {"text": f"Stats cache: {self.hits:,} hits / {self.misses:,} misses"}
+        return discord.Embed.from_dict(payload)
+
+
+def command_schema_hash(tree: discord.app_commands.CommandTree) -> str:
+    commands = []
+    for command in tree.get_commands():
+        try:
+            commands.append(command.to_dict(tree))
+        except TypeError:
+            commands.append(command.to_dict())
+    return hashlib.sha256(json.dumps(commands, sort_keys=True).encode()).hexdigest()
+
+
+HISTORY_WINDOWS = {"1h": 3600, "24h": 86400, "7d": 7 * 86400, "30d": 30 * 86400}
+# Custom hours would otherwise add an entry per distinct value
+HISTORY_CACHE_SIZE = 32
+
+
 class BanTrackerBot(discord.Client):
+    PHASE_NEW = "new"
+    PHASE_STARTING = "starting"
+    PHASE_RUNNING = "running"
+
     def __init__(self, intents: discord.Intents) -> None:
         super().__init__(intents=intents)
         self.tree = discord.app_commands.CommandTree(self)
         self.jsonconfig = JSONConfig("config.json")
-        self.bantracker = BanTracker()
+        self.bantracker = BanTracker(
+            BanHistory(
+                self.jsonconfig.get("history_file", "history.bin"),
+                self.jsonconfig.get("raw_history_days", 7) * 86400,
+                self.jsonconfig.get("minute_history_days", 90) * 86400
+            ),
+            self.jsonconfig.get("connect_timeout", 5),
+            self.jsonconfig.get("read_timeout", 10),
+            self.jsonconfig.get("total_timeout", 15),
+            self.jsonconfig.get("tick_deadline", 20),
+            self.jsonconfig.get("max_poll_interval", 120) + 30,
+            self.jsonconfig.get("http_pool_size", 10),
+            self.jsonconfig.get("shared_ssl_context", True),
+            self.jsonconfig.get("fetch_threads", 2),
+            [build_source(options) for options in self.jsonconfig.get("sources", [{"type": "plancke"}])],
+            self.jsonconfig.get("hedge", False),
+            self.jsonconfig.get("hedge_delay", 2)
+        )
+        self.store = SubscriptionStore(self.jsonconfig.get("database", "bantracker.db"))
+        tracker_state = self.store.load_state("tracker")
+        if tracker_state:
+            self.bantracker.restore(tracker_state)
         self.logger = logging.getLogger('discord')
-        self.channel_ids = []
+        self.subscriptions = SubscriptionRegistry()
+        self.message_builder = MessageBuilder(self.jsonconfig.get("combine_messages", True))
+        self.webhook_sink = WebhookSink(
+            self.jsonconfig.get("max_concurrent_webhooks", 100),
+            timeout=self.jsonconfig.get("webhook_timeout", 10)
+        )
+        self.fanout = FanOut(self, self.jsonconfig.get("max_concurrent_sends", 50), self.webhook_sink)
+        self.outbox = Outbox(self.jsonconfig.get("outbox_size", 16))
+        self.broadcaster = Broadcaster(
+            self,
+            self.jsonconfig.get("broadcast_channel"),
+            self.jsonconfig.get("broadcast_interval", 360)
+        )
+        if tracker_state:
+            # Counted in the restored totals, but still waiting for delivery when the bot stopped
+            for delta in tracker_state.get("pending", []):
+                self.outbox.put(BanDelta(**delta))
+            for delta in tracker_state.get("pending_broadcast", []):
+                self.broadcaster.pending.put(BanDelta(**delta))
+        self.delivery_task = None
+        self.broadcast_task = None
+        self.poll_task = None
+        self.config_task = None
+        self.sync_task = None
+        self.phase = self.PHASE_NEW
+        self.known_guilds = set()
+        self.clock = TickClock()
+        self.breaker = CircuitBreaker(
+            self.jsonconfig.get("breaker_threshold", 3),
+            self.jsonconfig.get("breaker_base_delay", 30),
+            self.jsonconfig.get("breaker_max_delay", 900)
+        )
+        self.scheduler = PollScheduler(
+            self.jsonconfig.get("poll_interval", 30),
+            self.jsonconfig.get("min_poll_interval", 10),
+            self.jsonconfig.get("max_poll_interval", 120),
+            self.jsonconfig.get("poll_jitter", 2),
+            self.jsonconfig.get("adaptive_polling", True)
+        )
+        self.history_cache = OrderedDict()
+        self.charts = ChartRenderer(self.jsonconfig.get("chart_workers", 1))
+        self.stats_cache = StatsCache(self.build_stats_embed, self.bantracker.start_time)
 
         @self.event
         async def on_ready():
-            await self.bantracker.init_session()
-            self.channel_ids = self.jsonconfig.get("channels", [])
-            
-            invalid_channels = []
-            for channel_id in self.channel_ids[:]:
-                if self.get_channel(channel_id) is None:
-                    invalid_channels.append(channel_id)
-                    self.channel_ids.remove(channel_id)
-            
-            if invalid_channels:
-                self.jsonconfig.update("channels", self.channel_ids)
-                self.logger.warning(f"Removed {len(invalid_channels)} invalid channel(s)")
-            
-            for guild in self.guilds:
-                self.tree.copy_global_to(guild=guild)
-                await self.tree.sync(guild=guild)
-            
-            plural = "s" if len(self.guilds) != 1 else ""
-            self.logger.info(f"Synced commands with {len(self.guilds)} guild{plural}.")
-            self.logger.info(f"Monitoring {len(self.channel_ids)} channel(s)")
-            check_loop.start()
+            if self.phase == self.PHASE_NEW:
+                self.phase = self.PHASE_STARTING
+                try:
+                    await self.start_up()
+                except Exception:
+                    self.phase = self.PHASE_NEW
+                    raise
+                self.phase = self.PHASE_RUNNING
+            elif self.phase == self.PHASE_RUNNING:
+                await self.reconnected()
 
         @self.event
         async def on_guild_join(guild):
-            self.tree.copy_global_to(guild=guild)
-            await self.tree.sync(guild=guild)
+            self.known_guilds.add(guild.id)
+            if self.jsonconfig.get("global_command_sync", False):
+                return
+            await self.sync_guild(guild, command_schema_hash(self.tree))
             self.logger.info(f"Synced commands with {guild.name}.")
 
+        @self.event
+        async def on_guild_remove(guild):
+            self.known_guilds.discard(guild.id)
+            await self.forget_guilds({guild.id})
+
         @self.tree.command()
-        async def subscribe(interaction: discord.Interaction):
+        @discord.app_commands.describe(
+            split_messages="Send watchdog and staff bans as separate messages",
+            use_webhook="Deliver through a channel webhook instead of the bot"
+        )
+        async def subscribe(interaction: discord.Interaction, split_messages: bool = False, use_webhook: bool = False):
             """Subscribes the channel to receive ban notifications"""
             if not interaction.user.guild_permissions.manage_channels:
                 await interaction.response.send_message(
@@ -174,11 +1612,54 @@ class BanTrackerBot(discord.Client):
                 )
                 return
             
-            if interaction.channel_id not in self.channel_ids:
-                self.channel_ids.append(interaction.channel_id)
-                self.jsonconfig.update("channels", self.channel_ids)
+            if self.broadcaster.enabled:
+                await interaction.response.defer()
+                try:
+                    followed = await self.broadcaster.follow(interaction.channel)
+                except discord.Forbidden:
+                    await interaction.followup.send("> ❌ I need the `Manage Webhooks` permission in this channel.")
+                    return
+                except BroadcastUnavailable as e:
+                    self.logger.error(str(e))
+                    await interaction.followup.send("> ❌ The broadcast channel is unavailable right now, please try again later.")
+                    return
+                
+                if followed:
+                    self.logger.info(f"{interaction.channel.name} in {interaction.guild.name} now follows the broadcast channel.")
+                    await interaction.followup.send("> ✅ This channel now follows ban notifications.")
+                else:
+                    await interaction.followup.send("> ℹ️ This channel is already subscribed.")
+                return
+
+            subscription = self.subscriptions.get(interaction.channel_id)
+            is_new = subscription is None
+            if is_new:
+                subscription = Subscription(interaction.channel_id, interaction.guild_id)
+            
+            format_changed = split_messages != subscription.split_messages
+
+            if use_webhook and subscription.webhook_url is None:
+                try:
+                    webhook = await interaction.channel.create_webhook(name="Ban Tracker", reason="Ban notifications")
+                except discord.Forbidden:
+                    await interaction.response.send_message(
+                        "> ❌ I need the `Manage Webhooks` permission in this channel.",
+                        ephemeral=True
+                    )
+                    return
+                subscription.webhook_url = webhook.url
+                format_changed = True
+
+            subscription.split_messages = split_messages
+            if is_new or format_changed:
+                await self.store.add(subscription)
+
+            if is_new:
+                self.subscriptions.add(subscription)
                 self.logger.info(f"{interaction.channel.name} in {interaction.guild.name} was subscribed.")
                 await interaction.response.send_message("> ✅ This channel is now subscribed to ban notifications.")
+            elif format_changed:
+                await interaction.response.send_message("> ✅ Updated the message format for this channel.")
             else:
                 await interaction.response.send_message("> ℹ️ This channel is already subscribed.")
 
@@ -192,19 +1673,89 @@ class BanTrackerBot(discord.Client):
                 )
                 return
             
-            if interaction.channel_id in self.channel_ids:
-                self.channel_ids.remove(interaction.channel_id)
-                self.jsonconfig.update("channels", self.channel_ids)
+            if self.broadcaster.enabled:
+                await interaction.response.defer()
+                try:
+                    unfollowed = await self.broadcaster.unfollow(interaction.channel)
+                except discord.Forbidden:
+                    await interaction.followup.send("> ❌ I need the `Manage Webhooks` permission in this channel.")
+                    return
+                
+                # Channels subscribed before broadcast mode was enabled are still sent to directly
+                if self.subscriptions.remove(interaction.channel_id):
+                    await self.store.remove([interaction.channel_id])
+                    unfollowed = True
+                
+                if unfollowed:
+                    self.logger.info(f"{interaction.channel.name} in {interaction.guild.name} was unsubscribed.")
+                    await interaction.followup.send("> ✅ This channel is no longer subscribed.")
+                else:
+                    await interaction.followup.send("> ℹ️ This channel is not subscribed.")
+                return
+
+            subscription = self.subscriptions.remove(interaction.channel_id)
+            if subscription:
+                await self.store.remove([interaction.channel_id])
+                if subscription.webhook_url:
+                    await self.remove_webhook(subscription)
                 self.logger.info(f"{interaction.channel.name} in {interaction.guild.name} was unsubscribed.")
                 await interaction.response.send_message("> ✅ This channel is no longer subscribed.")
             else:
                 await interaction.response.send_message("> ℹ️ This channel is not subscribed.")
 
         @self.tree.command()
-        async def stats(interaction: discord.Interaction):
+        @discord.app_commands.describe(chart="Attach a chart of the last 24 hours")
+        async def stats(interaction: discord.Interaction, chart: bool = False):
             """Shows statistics about the ban tracker"""
-            embed = self.bantracker.get_stats_embed()
-            await interaction.response.send_message(embed=embed)
+            embed = self.stats_cache.get()
+            if chart:
+                await self.send_with_chart(interaction, embed, HISTORY_WINDOWS["24h"], "last 24h")
+            else:
+                await interaction.response.send_message(embed=embed)
+
+        @self.tree.command()
+        @discord.app_commands.describe(
+            window="Time window to show",
+            hours="Window length in hours for a custom window",
+            chart="Attach a chart of the window"
+        )
+        @discord.app_commands.choices(window=[
+            discord.app_commands.Choice(name="Last hour", value="1h"),
+            discord.app_commands.Choice(name="Last 24 hours", value="24h"),
+            discord.app_commands.Choice(name="Last 7 days", value="7d"),
+            discord.app_commands.Choice(name="Last 30 days", value="30d"),
+            discord.app_commands.Choice(name="Custom", value="custom")
+        ])
+        async def history(interaction: discord.Interaction, window: str = "24h", hours: Optional[int] = None, chart: bool = False):
+            """Shows how many players were banned over a time window"""
+            if window == "custom":
+                if hours is None or hours < 1:
+                    await interaction.response.send_message(
+                        "> ❌ Pass the number of `hours` for a custom window.",
+                        ephemeral=True
+                    )
+                    return
+                seconds, label = hours * 3600, f"last {hours:,} hour{'s' if hours != 1 else ''}"
+            else:
+                seconds, label = HISTORY_WINDOWS[window], f"last {window}"
+            
+            # Keyed by the latest sample, so answers never lag behind it and a failed fetch keeps them valid
+            samples = self.bantracker.history.samples
+            key = (seconds, samples.timestamp(len(samples) - 1) if len(samples) else None)
+            cached = self.history_cache.get(key)
+            if cached is None:
+                cached = self.bantracker.get_history_embed(seconds, label).to_dict()
+                self.history_cache[key] = cached
+                while len(self.history_cache) > HISTORY_CACHE_SIZE:
+                    self.history_cache.popitem(last=False)
+            else:
+                self.history_cache.move_to_end(key)
+            
+            embed = discord.Embed.from_dict(cached)
+            if chart:
+                await self.send_with_chart(interaction, embed, seconds, label)
+            else:
+                await interaction.response.send_message(embed=embed)
 
         @self.tree.command()
         async def list_channels(interaction: discord.Interaction):
@@ -216,7 +1767,7 @@ class BanTrackerBot(discord.Client):
                 )
                 return
             
-            if not self.channel_ids:
+            if not self.subscriptions:
                 await interaction.response.send_message("> ℹ️ No channels are currently subscribed.")
                 return
             
@@ -226,7 +1777,8 @@ class BanTrackerBot(discord.Client):
                 description=""
             )
             
-            for channel_id in self.channel_ids:
+            for subscription in self.subscriptions:
+                channel_id = subscription.channel_id
                 channel = self.get_channel(channel_id)
                 if channel:
                     embed.description += f"• {channel.mention} ({channel.guild.name})\n"
@@ -235,34 +1787,363 @@ class BanTrackerBot(discord.Client):
             
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
-        @tasks.loop(seconds=30)
-        async def check_loop():
-            bans = await self.bantracker.check_bans()
-            if bans:
-                failed_channels = []
-                for channel_id in self.channel_ids:
-                    channel = self.get_channel(channel_id)
-                    if channel:
-                        try:
-                            for message in bans:
-                                await channel.send(message)
-                        except discord.Forbidden:
-                            self.logger.warning(f"No permission to send to channel {channel_id}")
-                            failed_channels.append(channel_id)
-                        except discord.HTTPException as e:
-                            self.logger.error(f"Failed to send to channel {channel_id}: {e}")
-                    else:
-                        failed_channels.append(channel_id)
-                
-                if failed_channels:
-                    for channel_id in failed_channels:
-                        if channel_id in self.channel_ids:
-                            self.channel_ids.remove(channel_id)
-                    self.jsonconfig.update("channels", self.channel_ids)
-                    self.logger.info(f"Removed {len(failed_channels)} failed channel(s)")
+    async def poll_loop(self):
+        period = self.scheduler.interval
+        while True:
+            await self.clock.wait(period)
+            try:
+                await self.check_once()
+            except Exception as e:
+                # check_bans already handles fetch errors, this keeps e.g. a failing store from ending polling
+                self.logger.error(f"Poll tick failed: {e}")
+            period = self.scheduler.next_delay(self.clock.wall_deadline())
+
+    async def check_once(self):
+        if not self.breaker.allow():
+            return
+        
+        if self.breaker.state == CircuitBreaker.HALF_OPEN and not await self.bantracker.probe():
+            self.bantracker.consecutive_errors += 1
+            self.breaker.record(self.bantracker.consecutive_errors)
+            self.stats_cache.invalidate()
+            return
+        
+        previous = (self.bantracker.owd_bans, self.bantracker.ostaff_bans)
+        delta = await self.bantracker.check_bans()
+        self.breaker.record(self.bantracker.consecutive_errors)
+        self.stats_cache.invalidate()
+        if delta:
+            self.outbox.put(delta)
+        if self.bantracker.consecutive_errors == 0 and self.bantracker.last_fetch_time:
+            current = (self.bantracker.owd_bans, self.bantracker.ostaff_bans)
+            bans = delta.watchdog + delta.staff if delta else 0
+            self.scheduler.observe(self.bantracker.last_fetch_time, previous[0] is not None and current != previous, bans)
+            await self.store.save_state("tracker", self.bantracker.snapshot())
+
+    async def sync_guild(self, guild: discord.Guild, schema_hash: str):
+        self.tree.copy_global_to(guild=guild)
+        await self.tree.sync(guild=guild)
+        await self.store.set_sync_hash(guild.id, schema_hash)
+
+    async def sync_commands(self):
+        schema_hash = command_schema_hash(self.tree)
+        synced = await asyncio.to_thread(self.store.load_sync_hashes)
+
+        if self.jsonconfig.get("global_command_sync", False):
+            # Guild copies from earlier per-guild syncs would show up twice next to the global commands
+            for guild in self.guilds:
+                if guild.id in synced:
+                    self.tree.clear_commands(guild=guild)
+                    await self.tree.sync(guild=guild)
+            await self.store.remove_sync_hashes([guild_id for guild_id in synced if guild_id != 0])
+
+            if synced.get(0) != schema_hash:
+                await self.tree.sync()
+                await self.store.set_sync_hash(0, schema_hash)
+                self.logger.info("Synced global commands.")
+            else:
+                self.logger.info("Global commands are up to date.")
+            return
+
+        if 0 in synced:
+            # Drop the global commands on Discord's side only, the tree still needs them to copy into guilds
+            await self.http.bulk_upsert_global_commands(self.application_id, payload=[])
+            await self.store.remove_sync_hashes([0])
+
+        outdated = [guild for guild in self.guilds if synced.get(guild.id) != schema_hash]
+        results = await self.sync_guilds(outdated, schema_hash)
+        
+        synced_count = sum(results)
+        plural = "s" if synced_count != 1 else ""
+        self.logger.info(
+            f"Synced commands with {synced_count} guild{plural}, {len(self.guilds) - len(outdated)} already up to date"
+            + (f", {len(outdated) - synced_count} failed." if synced_count != len(outdated) else ".")
+        )
+
+    async def sync_guilds(self, guilds: List[discord.Guild], schema_hash: str) -> List[bool]:
+        semaphore = asyncio.Semaphore(self.jsonconfig.get("command_sync_concurrency", 4))
+        resume_at = 0.0
+        done = 0
+        step = max(len(guilds) // 10, 1)
+
+        async def sync_one(guild: discord.Guild) -> bool:
+            nonlocal resume_at, done
+            for _ in range(5):
+                async with semaphore:
+                    # A 429 from one sync pauses all of them, the limit is shared by the whole application
+                    await asyncio.sleep(max(resume_at - time.monotonic(), 0))
+                    try:
+                        await self.sync_guild(guild, schema_hash)
+                        break
+                    except discord.HTTPException as e:
+                        if e.status != 429:
+                            self.logger.error(f"Failed to sync commands with {guild.name}: {e}")
+                            return False
+                        retry_after = float(e.response.headers.get("Retry-After", 1))
+                        resume_at = max(resume_at, time.monotonic() + retry_after)
+                        self.logger.warning(f"Rate limited while syncing commands, waiting {retry_after:.1f}s")
+            else:
+                self.logger.error(f"Gave up syncing commands with {guild.name} after repeated rate limits")
+                return False
+            
+            done += 1
+            if done % step == 0 or done == len(guilds):
+                self.logger.info(f"Command sync progress: {done}/{len(guilds)} guilds")
+            return True
+
+        return await asyncio.gather(*(sync_one(guild) for guild in guilds))
+
+    async def run_command_sync(self):
+        try:
+            await self.sync_commands()
+        except Exception as e:
+            self.logger.error(f"Command sync failed: {e}")
+
+    async def watch_config(self):
+        while True:
+            await asyncio.sleep(self.jsonconfig.get("config_reload_interval", 5))
+            try:
+                config = await self.jsonconfig.reload()
+            except (OSError, ValueError) as e:
+                self.logger.error(f"Failed to reload {self.jsonconfig.file_name}: {e}")
+                continue
+            if config is None:
+                continue
+            # A bad reload must never stop the watcher, the next edit to the file gets another chance
+            try:
+                await self.apply_config(config)
+            except Exception as e:
+                self.logger.error(f"Failed to apply {self.jsonconfig.file_name}: {e}")
+
+    async def apply_config(self, config: dict):
+        errors = validate_config(config)
+        if not errors:
+            try:
+                sources = [build_source(options) for options in config.get("sources", [{"type": "plancke"}])]
+            except Exception as e:
+                errors.append(f"invalid source: {e}")
+        if errors:
+            self.logger.error(f"Ignoring changes to {self.jsonconfig.file_name}: {'; '.join(errors)}")
+            return
+
+        # Everything is validated and built before the first setting is touched
+        old_config, self.jsonconfig.config = self.jsonconfig.config, config
+        if config.get("token") != old_config.get("token"):
+            self.logger.warning("The token changed, it will be used after the next restart")
+
+        tracker = self.bantracker
+        tracker.connect_timeout = config.get("connect_timeout", 5)
+        tracker.read_timeout = config.get("read_timeout", 10)
+        tracker.total_timeout = config.get("total_timeout", 15)
+        tracker.tick_deadline = config.get("tick_deadline", 20)
+        if config.get("sources") != old_config.get("sources"):
+            # An empty list falls back to plancke, the same as on startup
+            tracker.sources = sources or [PlanckeSource()]
+        tracker.hedge = config.get("hedge", False)
+        tracker.hedge_delay = config.get("hedge_delay", 2)
+
+        self.scheduler.interval = config.get("poll_interval", 30)
+        self.scheduler.min_interval = config.get("min_poll_interval", 10)
+        self.scheduler.max_interval = config.get("max_poll_interval", 120)
+        self.scheduler.jitter = config.get("poll_jitter", 2)
+        self.scheduler.adaptive = config.get("adaptive_polling", True)
+        self.breaker.threshold = config.get("breaker_threshold", 3)
+        self.breaker.base_delay = config.get("breaker_base_delay", 30)
+        self.breaker.max_delay = config.get("breaker_max_delay", 900)
+
+        # Sends already running keep their old slot, new ones use the new limit
+        self.fanout.semaphore = asyncio.Semaphore(config.get("max_concurrent_sends", 50))
+        self.webhook_sink.semaphore = asyncio.Semaphore(config.get("max_concurrent_webhooks", 100))
+        self.webhook_sink.timeout = config.get("webhook_timeout", 10)
+        self.outbox.maxsize = config.get("outbox_size", 16)
+        self.message_builder.combine = config.get("combine_messages", True)
+        self.broadcaster.channel_id = config.get("broadcast_channel")
+        self.broadcaster.check_channel()
+        self.broadcaster.min_interval = config.get("broadcast_interval", 360)
+
+        self.stats_cache.invalidate()
+        self.logger.info(f"Reloaded {self.jsonconfig.file_name}")
+
+    def build_stats_embed(self) -> discord.Embed:
+        embed = self.bantracker.get_stats_embed()
+        if self.fanout.last_stats:
+            self.fanout.last_stats.add_fields(embed)
+        if self.clock.deadline is not None:
+            self.clock.add_fields(embed)
+        self.breaker.add_fields(embed, self.bantracker.consecutive_errors)
+        if self.outbox.coalesced:
+            embed.add_field(name="📮 Coalesced Updates", value=f"{self.outbox.coalesced:,}", inline=True)
+        return embed
+
+    async def send_with_chart(self, interaction: discord.Interaction, embed: discord.Embed, seconds: int, label: str):
+        history = self.bantracker.history
+        if not self.charts.available or not len(history.samples):
+            await interaction.response.send_message(
+                content="> ℹ️ Charts are unavailable, matplotlib is not installed." if not self.charts.available else None,
+                embed=embed
+            )
+            return
+        
+        await interaction.response.defer()
+        end = time.time()
+        tier = history.chart_tier(end - seconds, end)
+        key = (seconds, tier.resolution, history.samples.timestamp(len(history.samples) - 1))
+        try:
+            png = await self.charts.render(key, tier.buckets(end - seconds, end), f"Bans per {tier.name}, {label}")
+        except Exception as e:
+            self.logger.error(f"Failed to render chart: {e}")
+            await interaction.followup.send(embed=embed)
+            return
+        
+        embed.set_image(url="attachment://bans.png")
+        await interaction.followup.send(embed=embed, file=discord.File(io.BytesIO(png), filename="bans.png"))
+
+    async def start_up(self):
+        await self.bantracker.init_session()
+        await self.webhook_sink.start()
+        self.migrate_json_channels()
+        self.subscriptions.clear()
+        for subscription in await asyncio.to_thread(self.store.load):
+            self.subscriptions.add(subscription)
+        
+        invalid_channels = [
+            subscription.channel_id for subscription in self.subscriptions
+            if self.get_channel(subscription.channel_id) is None
+        ]
+        
+        if invalid_channels:
+            self.subscriptions.remove_many(invalid_channels)
+            await self.store.remove(invalid_channels)
+            self.logger.warning(f"Removed {len(invalid_channels)} invalid channel(s)")
+        
+        self.broadcaster.check_channel()
+
+        self.known_guilds = {guild.id for guild in self.guilds}
+        self.sync_task = asyncio.create_task(self.run_command_sync())
+        self.logger.info(f"Monitoring {len(self.subscriptions)} channel(s)")
+        self.delivery_task = asyncio.create_task(self.delivery_worker())
+        self.broadcast_task = asyncio.create_task(self.broadcast_worker())
+        self.poll_task = asyncio.create_task(self.poll_loop())
+        self.config_task = asyncio.create_task(self.watch_config())
+
+    async def reconnected(self):
+        # Only guilds that came or went while disconnected need any REST calls
+        current = {guild.id for guild in self.guilds}
+        left, joined = self.known_guilds - current, current - self.known_guilds
+        self.known_guilds = current
+        
+        if left:
+            await self.forget_guilds(left)
+        if joined and not self.jsonconfig.get("global_command_sync", False):
+            schema_hash = command_schema_hash(self.tree)
+            synced = await asyncio.to_thread(self.store.load_sync_hashes)
+            outdated = [guild for guild in self.guilds if guild.id in joined and synced.get(guild.id) != schema_hash]
+            if outdated:
+                self.sync_task = asyncio.create_task(self.sync_guilds(outdated, schema_hash))
+        self.logger.info(f"Reconnected: {len(joined)} guild(s) joined, {len(left)} left while disconnected")
+
+    async def forget_guilds(self, guild_ids: set):
+        channel_ids = [channel_id for guild_id in guild_ids for channel_id in self.subscriptions.in_guild(guild_id)]
+        if channel_ids:
+            self.subscriptions.remove_many(channel_ids)
+            await self.store.remove(channel_ids)
+            self.logger.info(f"Removed {len(channel_ids)} channel(s) of {len(guild_ids)} guild(s) the bot is no longer in")
+        await self.store.remove_sync_hashes(list(guild_ids))
+
+    async def delivery_worker(self):
+        while True:
+            delta = await self.outbox.get()
+            try:
+                await self.deliver_update(delta)
+            except Exception as e:
+                self.logger.error(f"Failed to deliver ban update: {e}")
+
+    async def broadcast_worker(self):
+        while True:
+            await self.broadcaster.wait_ready()
+            delta = await self.broadcaster.pending.get()
+            try:
+                # One publish per interval keeps to Discord's 10 per hour, whatever combine_messages says
+                await self.broadcaster.publish(["\n".join(self.message_builder.build(delta, split=True))])
+            except Exception as e:
+                self.logger.error(f"Failed to publish ban update: {e}")
+
+    async def deliver_update(self, delta: BanDelta):
+        combined = self.message_builder.build(delta)
+        split = self.message_builder.build(delta, split=True)
+
+        if self.broadcaster.enabled:
+            # Only the publishes are spaced out, channels sent to directly get the update right away
+            self.broadcaster.pending.put(BanDelta(delta.watchdog, delta.staff, delta.total_wd_tracked, delta.total_staff_tracked))
+            if not self.subscriptions:
+                return
+
+        failed_channels = await self.fanout.deliver(
+            self.subscriptions.snapshot(),
+            lambda subscription: split if subscription.split_messages else combined
+        )
+        self.stats_cache.invalidate()
+
+        if self.webhook_sink.gone:
+            gone = self.webhook_sink.gone
+            self.webhook_sink.gone = set()
+            gone_channels = []
+            for subscription in self.subscriptions:
+                if subscription.webhook_url in gone:
+                    subscription.webhook_url = None
+                    gone_channels.append(subscription.channel_id)
+            await self.store.set_webhooks([(None, channel_id) for channel_id in gone_channels])
+
+        if failed_channels:
+            self.subscriptions.remove_many(failed_channels)
+            await self.store.remove(failed_channels)
+            self.logger.info(f"Removed {len(failed_channels)} failed channel(s)")
+
+    def migrate_json_channels(self):
+        split_channels = set(self.jsonconfig.get("split_channels", []))
+        webhooks = {int(channel_id): url for channel_id, url in self.jsonconfig.get("webhooks", {}).items()}
+        rows = []
+        for channel_id in self.jsonconfig.get("channels", []):
+            channel = self.get_channel(channel_id)
+            guild_id = channel.guild.id if channel and channel.guild else None
+            rows.append((channel_id, guild_id, int(channel_id in split_channels), webhooks.get(channel_id)))
+        
+        if self.store.migrate(rows) and rows:
+            self.logger.info(f"Migrated {len(rows)} channel(s) from {self.jsonconfig.file_name} to {self.store.file_name}")
+
+    async def save_pending(self):
+        # The totals already count every delta in the outboxes, so they go out after the restart instead of being lost
+        state = self.bantracker.snapshot()
+        state["pending"] = [vars(delta) for delta in self.outbox.pending]
+        state["pending_broadcast"] = [vars(delta) for delta in self.broadcaster.pending.pending]
+        await self.store.save_state("tracker", state)
+
+    async def remove_webhook(self, subscription: Subscription):
+        try:
+            await self.webhook_sink.delete(subscription.webhook_url)
+        except Exception as e:
+            self.logger.warning(f"Failed to delete webhook of channel {subscription.channel_id}: {e}")
 
     async def close(self):
+        if self.sync_task:
+            self.sync_task.cancel()
+        if self.config_task:
+            self.config_task.cancel()
+        if self.poll_task:
+            self.poll_task.cancel()
+        if self.delivery_task:
+            self.delivery_task.cancel()
+        if self.broadcast_task:
+            self.broadcast_task.cancel()
+        try:
+            await self.save_pending()
+        except Exception as e:
+            self.logger.error(f"Failed to save undelivered updates: {e}")
+        await self.webhook_sink.close()
         await self.bantracker.close_session()
+        self.bantracker.history.close()
+        self.charts.close()
+        self.store.close()
         await super().close()
 
 
@@ -0,0 +1,67 @@
+import os
+import sys
+import json
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self) -> None:
+        self.sent = []
+        self.deferred = False
+
+    async def send_message(self, content=None, **kwargs):
+        self.sent.append(dict(kwargs, content=content))
+
+    async def defer(self, **kwargs):
+        self.deferred = True
+
+
+class FakeFollowup:
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(dict(kwargs, content=content))
+
+
+class FakeInteraction:
+    def __init__(self, admin: bool = True) -> None:
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+        permissions = SimpleNamespace(manage_channels=admin, administrator=admin)
+        self.user = SimpleNamespace(guild_permissions=permissions)
+        self.guild = SimpleNamespace(id=10, name="Guild")
+        self.guild_id = self.guild.id
+        self.channel = SimpleNamespace(id=20, name="bans", guild=self.guild)
+        self.channel_id = self.channel.id
+
+
+@pytest.fixture
+def interaction():
+    return FakeInteraction()
+
+
+@pytest.fixture
+def make_bot(tmp_path, monkeypatch):
+    # The bot reads config.json and creates its database and history files in the working directory
+    monkeypatch.chdir(tmp_path)
+    bots = []
+
+    def make(**config):
+        with open("config.json", "w") as conf:
+            json.dump(dict({"token": "TOKEN", "channels": []}, **config), conf)
+        tracker_bot = bot.BanTrackerBot(bot.discord.Intents.default())
+        bots.append(tracker_bot)
+        return tracker_bot
+
+    yield make
+    for tracker_bot in bots:
+        tracker_bot.bantracker.history.close()
+        tracker_bot.charts.close()
+        tracker_bot.store.close()
@@ -0,0 +1,86 @@
+import asyncio
+
+import bot
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_breaker(monkeypatch, **settings):
+    clock = FakeClock()
+    monkeypatch.setattr(bot.time, "monotonic", clock)
+    return bot.CircuitBreaker(**settings), clock
+
+
+def test_opens_after_threshold(monkeypatch):
+    breaker, clock = make_breaker(monkeypatch, threshold=3, base_delay=30)
+    breaker.record(1)
+    breaker.record(2)
+    assert breaker.state == bot.CircuitBreaker.CLOSED and breaker.allow()
+
+    breaker.record(3)
+    assert breaker.state == bot.CircuitBreaker.OPEN and not breaker.allow()
+    # Equal jitter waits at least half the backoff
+    assert 15 <= breaker.retry_at - clock.now <= 30
+
+
+def test_half_open_after_delay_then_closes(monkeypatch):
+    breaker, clock = make_breaker(monkeypatch, threshold=1, base_delay=30)
+    breaker.record(1)
+    clock.now = breaker.retry_at
+    assert breaker.allow()
+    assert breaker.state == bot.CircuitBreaker.HALF_OPEN
+
+    breaker.record(0)
+    assert breaker.state == bot.CircuitBreaker.CLOSED
+    assert breaker.trips == 0
+
+
+def test_failed_probe_reopens_with_longer_delay(monkeypatch):
+    breaker, clock = make_breaker(monkeypatch, threshold=3, base_delay=30, max_delay=900)
+    breaker.record(3)
+    clock.now = breaker.retry_at
+    assert breaker.allow()
+
+    # A single failure in half-open trips again, below the threshold
+    breaker.record(4)
+    assert breaker.state == bot.CircuitBreaker.OPEN
+    assert breaker.trips == 2
+    assert 30 <= breaker.retry_at - clock.now <= 60
+
+
+def test_delay_is_capped(monkeypatch):
+    breaker, clock = make_breaker(monkeypatch, threshold=1, base_delay=30, max_delay=100)
+    for _ in range(10):
+        breaker.record(1)
+    assert 50 <= breaker.retry_at - clock.now <= 100
+
+
+def test_check_once_skips_fetch_on_failed_probe(make_bot, monkeypatch):
+    tracker_bot = make_bot()
+    calls = []
+
+    async def probe():
+        calls.append("probe")
+        return False
+
+    async def check_bans():
+        calls.append("fetch")
+
+    monkeypatch.setattr(tracker_bot.bantracker, "probe", probe)
+    monkeypatch.setattr(tracker_bot.bantracker, "check_bans", check_bans)
+    tracker_bot.breaker.state = bot.CircuitBreaker.HALF_OPEN
+    tracker_bot.bantracker.consecutive_errors = 3
+
+    asyncio.run(tracker_bot.check_once())
+    assert calls == ["probe"]
+    assert tracker_bot.breaker.state == bot.CircuitBreaker.OPEN
+
+    # Still open, so the next tick neither probes nor fetches
+    asyncio.run(tracker_bot.check_once())
+    assert calls == ["probe"]
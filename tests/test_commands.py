@@ -0,0 +1,47 @@
+import asyncio
+
+from conftest import FakeInteraction
+
+
+def run_command(tracker_bot, name: str, interaction, **options):
+    asyncio.run(tracker_bot.tree.get_command(name).callback(interaction, **options))
+    return interaction.response.sent[-1]
+
+
+def test_subscribe_and_unsubscribe(make_bot, interaction):
+    tracker_bot = make_bot()
+    assert "now subscribed" in run_command(tracker_bot, "subscribe", interaction)["content"]
+    assert tracker_bot.subscriptions.get(interaction.channel_id) is not None
+    assert "already subscribed" in run_command(tracker_bot, "subscribe", interaction)["content"]
+
+    assert "no longer subscribed" in run_command(tracker_bot, "unsubscribe", interaction)["content"]
+    assert tracker_bot.subscriptions.get(interaction.channel_id) is None
+    assert "not subscribed" in run_command(tracker_bot, "unsubscribe", interaction)["content"]
+
+
+def test_subscribe_needs_manage_channels(make_bot):
+    tracker_bot = make_bot()
+    sent = run_command(tracker_bot, "subscribe", FakeInteraction(admin=False))
+    assert sent["ephemeral"] is True
+    assert not tracker_bot.subscriptions
+
+
+def test_stats(make_bot, interaction):
+    tracker_bot = make_bot()
+    assert run_command(tracker_bot, "stats", interaction)["embed"].title
+
+
+def test_list_channels(make_bot, interaction):
+    tracker_bot = make_bot()
+    assert "No channels" in run_command(tracker_bot, "list_channels", interaction)["content"]
+    run_command(tracker_bot, "subscribe", interaction)
+    embed = run_command(tracker_bot, "list_channels", interaction)["embed"]
+    assert "ID: 20" in embed.description
+    assert run_command(tracker_bot, "list_channels", FakeInteraction(admin=False))["ephemeral"] is True
+
+
+def test_subscribe_with_missing_broadcast_channel(make_bot, interaction):
+    tracker_bot = make_bot(broadcast_channel=123)
+    asyncio.run(tracker_bot.tree.get_command("subscribe").callback(interaction))
+    assert interaction.response.deferred
+    assert "broadcast channel is unavailable" in interaction.followup.sent[-1]["content"]
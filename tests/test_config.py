@@ -0,0 +1,111 @@
+import asyncio
+
+import bot
+
+
+def test_valid_config():
+    assert bot.validate_config({"token": "TOKEN", "channels": [1, 2], "poll_interval": 15}) == []
+
+
+def test_config_must_be_an_object():
+    assert bot.validate_config([]) == ["the config must be a JSON object"]
+
+
+def test_token_must_be_a_string():
+    assert bot.validate_config({"token": 5}) == ["token must be a string"]
+
+
+def test_settings_must_be_positive_numbers():
+    errors = bot.validate_config({"token": "TOKEN", "poll_interval": 0, "outbox_size": True, "hedge_delay": -1})
+    assert errors == [
+        "outbox_size must be a positive number",
+        "poll_interval must be a positive number",
+        "hedge_delay must be a positive number"
+    ]
+
+
+def test_channels_must_be_ids():
+    assert bot.validate_config({"token": "TOKEN", "channels": [1, "2"]}) == ["channels must be a list of channel IDs"]
+
+
+def test_broadcast_channel_must_be_an_id():
+    assert bot.validate_config({"token": "TOKEN", "broadcast_channel": 123}) == []
+    assert bot.validate_config({"token": "TOKEN", "broadcast_channel": "123"}) == ["broadcast_channel must be a channel ID"]
+    assert bot.validate_config({"token": "TOKEN", "broadcast_channel": True}) == ["broadcast_channel must be a channel ID"]
+
+
+def test_poll_interval_bounds_must_be_ordered():
+    errors = bot.validate_config({"token": "TOKEN", "min_poll_interval": 60, "max_poll_interval": 30})
+    assert errors == ["min_poll_interval must not be larger than max_poll_interval"]
+
+
+def test_bad_types_are_errors_not_exceptions():
+    assert bot.validate_config({"token": "TOKEN", "channels": 5}) == ["channels must be a list of channel IDs"]
+    assert bot.validate_config({"token": "TOKEN", "min_poll_interval": "a"}) == [
+        "min_poll_interval must be a positive number"
+    ]
+    assert bot.validate_config({"token": "TOKEN", "max_poll_interval": None}) == [
+        "max_poll_interval must be a positive number"
+    ]
+    assert bot.validate_config({"token": "TOKEN", "sources": "x"}) == ["sources must be a list of objects"]
+
+
+def test_invalid_reload_keeps_old_config(make_bot):
+    tracker_bot = make_bot()
+    old_config = tracker_bot.jsonconfig.config
+    for bad in ({"channels": 5}, {"max_poll_interval": None}, {"sources": "x"}, {"sources": [{"type": "http"}]}):
+        asyncio.run(tracker_bot.apply_config(dict({"token": "TOKEN"}, **bad)))
+        assert tracker_bot.jsonconfig.config is old_config
+
+
+def test_reload_rebuilds_changed_sources(make_bot):
+    tracker_bot = make_bot(sources=[{"type": "http", "url": "https://example.com", "name": "example"}])
+    config = {"token": "TOKEN", "sources": [{"type": "http", "url": "https://example.com", "name": "example", "record_key": None}]}
+    asyncio.run(tracker_bot.apply_config(config))
+    assert tracker_bot.bantracker.sources[0].record_key is None
+
+
+def test_reload_with_empty_sources_falls_back_to_plancke(make_bot):
+    tracker_bot = make_bot()
+    asyncio.run(tracker_bot.apply_config({"token": "TOKEN", "sources": []}))
+    assert [source.name for source in tracker_bot.bantracker.sources] == ["plancke"]
+
+
+def test_reload_ignores_broadcast_channel_that_is_not_an_announcement_channel(make_bot):
+    tracker_bot = make_bot()
+    asyncio.run(tracker_bot.apply_config({"token": "TOKEN", "broadcast_channel": 123}))
+    assert not tracker_bot.broadcaster.enabled
+
+
+def test_reload_leaves_subscriptions_alone(make_bot):
+    tracker_bot = make_bot()
+    asyncio.run(tracker_bot.apply_config({"token": "TOKEN", "channels": [1, 2]}))
+    # channels is only imported once on startup, /subscribe and /unsubscribe own the list afterwards
+    assert len(tracker_bot.subscriptions) == 0
+    assert tracker_bot.store.load() == []
+
+
+def test_watch_config_survives_a_failed_apply(make_bot, monkeypatch):
+    tracker_bot = make_bot(config_reload_interval=0.001)
+    configs = [{"token": "TOKEN"}, {"token": "TOKEN"}]
+    applied = []
+
+    async def reload():
+        return configs.pop() if configs else None
+
+    async def apply_config(config):
+        applied.append(config)
+        if len(applied) == 1:
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(tracker_bot.jsonconfig, "reload", reload)
+    monkeypatch.setattr(tracker_bot, "apply_config", apply_config)
+
+    async def main():
+        watcher = asyncio.create_task(tracker_bot.watch_config())
+        while len(applied) < 2:
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+    assert len(applied) == 2
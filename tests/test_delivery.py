@@ -0,0 +1,82 @@
+import time
+import asyncio
+
+import bot
+
+
+def delta(watchdog: int, staff: int = 0, total: int = 0) -> bot.BanDelta:
+    return bot.BanDelta(watchdog, staff, total, 0)
+
+
+def test_outbox_merges_everything_pending():
+    async def main():
+        outbox = bot.Outbox()
+        outbox.put(delta(1, 0, 10))
+        outbox.put(delta(2, 1, 12))
+        merged = await outbox.get()
+        return merged, outbox
+
+    merged, outbox = asyncio.run(main())
+    assert (merged.watchdog, merged.staff, merged.total_wd_tracked) == (3, 1, 12)
+    assert outbox.coalesced == 1
+    assert not outbox.pending
+
+
+def test_outbox_folds_into_newest_when_full():
+    async def main():
+        outbox = bot.Outbox(maxsize=2)
+        for watchdog in (1, 2, 3, 4):
+            outbox.put(delta(watchdog, 0, watchdog))
+        return outbox
+
+    outbox = asyncio.run(main())
+    assert len(outbox.pending) == 2
+    assert [pending.watchdog for pending in outbox.pending] == [1, 9]
+    assert outbox.pending[-1].total_wd_tracked == 4
+
+
+def test_outbox_get_waits_for_put():
+    async def main():
+        outbox = bot.Outbox()
+        getter = asyncio.create_task(outbox.get())
+        await asyncio.sleep(0)
+        assert not getter.done()
+        outbox.put(delta(5))
+        return await asyncio.wait_for(getter, 1)
+
+    assert asyncio.run(main()).watchdog == 5
+
+
+def test_message_builder_combines_unless_split():
+    builder = bot.MessageBuilder()
+    update = bot.BanDelta(2, 1, 10, 5)
+    assert len(builder.build(update)) == 1
+    assert len(builder.build(update, split=True)) == 2
+    assert builder.build(bot.BanDelta(0, 0, 10, 5)) == []
+
+
+def test_broadcast_interval_does_not_hold_back_direct_sends(make_bot, monkeypatch):
+    tracker_bot = make_bot(broadcast_channel=123)
+    tracker_bot.subscriptions.add(bot.Subscription(20, 10))
+    tracker_bot.broadcaster.last_publish = time.monotonic()
+    sent = []
+
+    async def deliver(subscriptions, messages_for):
+        sent.extend(messages_for(subscription) for subscription in subscriptions)
+        return []
+
+    monkeypatch.setattr(tracker_bot.fanout, "deliver", deliver)
+    asyncio.run(asyncio.wait_for(tracker_bot.deliver_update(delta(2, 1, 10)), 1))
+    assert len(sent) == 1
+    assert len(tracker_bot.broadcaster.pending.pending) == 1
+
+
+def test_undelivered_updates_survive_a_restart(make_bot):
+    tracker_bot = make_bot()
+    tracker_bot.outbox.put(delta(2, 1, 10))
+    tracker_bot.broadcaster.pending.put(delta(1, 0, 9))
+    asyncio.run(tracker_bot.save_pending())
+
+    restarted = make_bot()
+    assert [(pending.watchdog, pending.staff, pending.total_wd_tracked) for pending in restarted.outbox.pending] == [(2, 1, 10)]
+    assert [pending.watchdog for pending in restarted.broadcaster.pending.pending] == [1]
@@ -0,0 +1,140 @@
+import time
+import asyncio
+
+import pytest
+
+import bot
+
+# Aligned to a day, so every tier's buckets start exactly on it
+BASE = 19676 * 86400
+START = BASE + 1234.5
+
+
+@pytest.fixture
+def tier(tmp_path):
+    tier = bot.RollupTier(str(tmp_path / "minute.bin"), 60)
+    yield tier
+    tier.close()
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = bot.BanHistory(str(tmp_path / "history.bin"))
+    yield history
+    history.close()
+
+
+def test_rollup_sum_matches_brute_force(tier):
+    events = [(START + i * 17, i % 4, i % 3) for i in range(2000)]
+    for timestamp, wd, staff in events:
+        tier.add(timestamp, wd, staff)
+
+    # Windows aligned to buckets have no partial bucket, so they must be exact
+    for start, end in [(BASE, BASE + 1800), (BASE + 3600, BASE + 30000)]:
+        expected = (
+            sum(wd for timestamp, wd, _ in events if start <= timestamp < end),
+            sum(staff for timestamp, _, staff in events if start <= timestamp < end)
+        )
+        assert tier.sum(start, end) == expected
+
+
+def test_rollup_sum_counts_share_of_partial_bucket(tier):
+    tier.add(START, 60, 0)
+    bucket = START - START % 60
+    assert tier.sum(bucket + 30, bucket + 60) == (30, 0)
+    assert tier.sum(bucket + 60, bucket + 120) == (0, 0)
+
+
+def test_rollup_add_after_clock_steps_back(tier):
+    tier.add(BASE + 65, 1, 0)
+    tier.add(BASE + 55, 2, 0)
+    assert len(tier.series) == 1
+    assert tier.sum(BASE, BASE + 120) == (3, 0)
+
+
+def test_rollup_sum_empty(tier):
+    assert tier.sum(START, START + 3600) == (0, 0)
+
+
+def test_count_on_new_deployment(history):
+    # 19 hours of one ban per minute, younger than every tier's window
+    for minute in range(19 * 60):
+        history.record(START + minute * 60, {}, 1, 0)
+    now = START + 19 * 3600
+    assert history.count(now - 86400, now) == (1140, 0)
+    # Off by at most the share of the minute straddling the window start
+    wd, _ = history.count(now - 3600, now)
+    assert abs(wd - 60) <= 1
+
+
+def test_count_after_half_an_hour(history):
+    for minute in range(30):
+        history.record(START + minute * 60, {}, 1, 2)
+    now = START + 1800
+    assert history.count(now - 3600, now) == (30, 60)
+
+
+def test_count_past_minute_retention(tmp_path):
+    history = bot.BanHistory(str(tmp_path / "history.bin"), 3600, 86400)
+    try:
+        for minute in range(3 * 24 * 60):
+            history.record(START + minute * 60, {}, 1, 0)
+        now = START + 3 * 86400
+        assert history.tier_for(now - 2 * 86400, now).resolution == 3600
+        wd, _ = history.count(now - 2 * 86400, now)
+        assert abs(wd - 2 * 24 * 60) <= 60
+    finally:
+        history.close()
+
+
+def test_history_command(make_bot, interaction):
+    tracker_bot = make_bot()
+    now = time.time()
+    for minute in range(90):
+        tracker_bot.bantracker.history.record(now - 5400 + minute * 60, {}, 2, 1)
+
+    command = tracker_bot.tree.get_command("history")
+    asyncio.run(command.callback(interaction, window="1h"))
+
+    embed = interaction.response.sent[0]["embed"]
+    fields = {field.name: field.value for field in embed.fields}
+    assert abs(int(fields["🐶 Watchdog"]) - 120) <= 2
+    assert abs(int(fields["👮 Staff"]) - 60) <= 1
+    assert int(fields["📈 Total"]) == int(fields["🐶 Watchdog"]) + int(fields["👮 Staff"])
+    assert "⏱️ Per Hour" in fields
+    assert [seconds for seconds, _ in tracker_bot.history_cache] == [3600]
+
+
+def test_history_cache_follows_latest_sample(make_bot, interaction):
+    tracker_bot = make_bot()
+    history = tracker_bot.bantracker.history
+    command = tracker_bot.tree.get_command("history")
+    history.record(time.time() - 60, {}, 1, 0)
+    asyncio.run(command.callback(interaction, window="1h"))
+    history.record(time.time(), {}, 1, 0)
+    asyncio.run(command.callback(interaction, window="1h"))
+
+    totals = [{field.name: field.value for field in sent["embed"].fields}["📈 Total"] for sent in interaction.response.sent]
+    assert totals == ["1", "2"]
+
+    for hours in range(1, bot.HISTORY_CACHE_SIZE + 10):
+        asyncio.run(command.callback(interaction, window="custom", hours=hours))
+    assert len(tracker_bot.history_cache) == bot.HISTORY_CACHE_SIZE
+
+
+def test_history_command_without_data(make_bot, interaction):
+    tracker_bot = make_bot()
+    command = tracker_bot.tree.get_command("history")
+    asyncio.run(command.callback(interaction, window="custom", hours=5))
+
+    embed = interaction.response.sent[0]["embed"]
+    assert embed.title == "📜 Bans in the last 5 hours"
+    assert {field.name: field.value for field in embed.fields}["📈 Total"] == "0"
+
+
+def test_history_command_needs_hours_for_custom_window(make_bot, interaction):
+    tracker_bot = make_bot()
+    command = tracker_bot.tree.get_command("history")
+    asyncio.run(command.callback(interaction, window="custom"))
+
+    assert interaction.response.sent[0]["ephemeral"] is True
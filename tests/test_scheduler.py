@@ -0,0 +1,43 @@
+import math
+import random
+
+import bot
+
+
+def simulate(period: float, hours: float = 6, seed: int = 0, **settings):
+    random.seed(seed)
+    phase = random.Random(seed).uniform(0, period)
+    scheduler = bot.PollScheduler(**settings)
+    now = last = 1000.0
+    latencies = []
+    while now < 1000 + hours * 3600:
+        now += scheduler.next_delay(now)
+        refreshes = range(math.floor((last - phase) / period) + 1, math.floor((now - phase) / period) + 1)
+        if now > 1000 + hours * 1800:
+            latencies.extend(now - phase - refresh * period for refresh in refreshes)
+        scheduler.observe(now, len(refreshes) > 0, 3 if refreshes else 0)
+        last = now
+    return scheduler, sorted(latencies)[len(latencies) // 2]
+
+
+def test_scheduler_learns_slower_refresh():
+    for period in (45, 60, 90):
+        scheduler, median = simulate(period)
+        assert scheduler.period == period
+        # Fixed polling every 30s sees a change about 15s after it on average
+        assert median < 10
+
+
+def test_scheduler_keeps_fixed_polling_for_faster_refresh():
+    for period in (20, 30):
+        scheduler, _ = simulate(period)
+        assert scheduler.period is None
+
+
+def test_scheduler_refits_every_few_ticks(monkeypatch):
+    scheduler = bot.PollScheduler(max_interval=3600)
+    fits = []
+    monkeypatch.setattr(scheduler, "fit", lambda: fits.append(scheduler.ticks))
+    for tick in range(51):
+        scheduler.observe(1000 + 30 * tick, tick % 2 == 0, 1)
+    assert fits == [5, 10, 15, 20, 25, 30, 35, 40, 45, 50]
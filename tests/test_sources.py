@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+import bot
+
+
+class FakeSource(bot.PunishmentSource):
+    def __init__(self, name: str, delay: float = 0, error: Exception = None) -> None:
+        super().__init__(name)
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def fetch(self, tracker: "bot.BanTracker") -> dict:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return {"watchdog_total": 1, "staff_total": 1, "source": self.name}
+
+    async def probe(self, tracker: "bot.BanTracker") -> bool:
+        return True
+
+
+def fetch_hedged(primary: FakeSource, backup: FakeSource, hedge_delay: float = 0.05):
+    tracker = bot.BanTracker(sources=[primary, backup], hedge=True, hedge_delay=hedge_delay)
+
+    async def run():
+        try:
+            return await tracker.fetch_hedged()
+        finally:
+            # Give cancelled losers a chance to see their cancellation
+            await asyncio.sleep(0)
+            await tracker.close_session()
+    return tracker, asyncio.run(run())
+
+
+def test_source_needs_fetch_and_probe():
+    with pytest.raises(TypeError):
+        bot.PunishmentSource("incomplete")
+
+
+def test_fast_primary_is_not_hedged():
+    primary, backup = FakeSource("primary"), FakeSource("backup")
+    tracker, (source, _) = fetch_hedged(primary, backup)
+    assert source is primary
+    assert backup.calls == 0
+    assert tracker.hedges == 0
+
+
+def test_primary_failing_fast_hedges_at_once():
+    primary, backup = FakeSource("primary", error=ValueError("down")), FakeSource("backup")
+    tracker, (source, _) = fetch_hedged(primary, backup, hedge_delay=5)
+    assert source is backup
+    assert tracker.hedges == 1
+
+
+def test_slow_primary_loses_to_backup_and_is_cancelled():
+    primary, backup = FakeSource("primary", delay=5), FakeSource("backup")
+    tracker, (source, record) = fetch_hedged(primary, backup)
+    assert source is backup and record["source"] == "backup"
+    assert tracker.hedges == 1
+    assert primary.cancelled
+
+
+def test_slow_backup_is_cancelled_when_primary_wins():
+    primary, backup = FakeSource("primary", delay=0.1), FakeSource("backup", delay=5)
+    tracker, (source, _) = fetch_hedged(primary, backup)
+    assert source is primary
+    assert backup.cancelled
+
+
+def test_both_failing_raises():
+    primary = FakeSource("primary", error=ValueError("primary down"))
+    backup = FakeSource("backup", delay=0.01, error=ValueError("backup down"))
+    with pytest.raises(ValueError, match="backup down"):
+        fetch_hedged(primary, backup)
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+import bot
+
+
+def patch_start_up(tracker_bot, monkeypatch, fail: bool = False):
+    calls = {"start_up": 0, "reconnected": 0}
+    release = asyncio.Event()
+
+    async def start_up():
+        calls["start_up"] += 1
+        await release.wait()
+        if fail:
+            raise RuntimeError("boom")
+
+    async def reconnected():
+        calls["reconnected"] += 1
+
+    monkeypatch.setattr(tracker_bot, "start_up", start_up)
+    monkeypatch.setattr(tracker_bot, "reconnected", reconnected)
+    return calls, release
+
+
+def test_on_ready_starts_up_once(make_bot, monkeypatch):
+    tracker_bot = make_bot()
+
+    async def main():
+        calls, release = patch_start_up(tracker_bot, monkeypatch)
+        first = asyncio.create_task(tracker_bot.on_ready())
+        await asyncio.sleep(0)
+        assert tracker_bot.phase == bot.BanTrackerBot.PHASE_STARTING
+
+        # A reconnect while start-up is still running neither starts up again nor counts as a reconnect
+        await tracker_bot.on_ready()
+        release.set()
+        await first
+        assert tracker_bot.phase == bot.BanTrackerBot.PHASE_RUNNING
+
+        await tracker_bot.on_ready()
+        return calls
+
+    assert asyncio.run(asyncio.wait_for(main(), 5)) == {"start_up": 1, "reconnected": 1}
+
+
+def test_failed_start_up_is_retried_on_next_ready(make_bot, monkeypatch):
+    tracker_bot = make_bot()
+
+    async def main():
+        calls, release = patch_start_up(tracker_bot, monkeypatch, fail=True)
+        release.set()
+        with pytest.raises(RuntimeError):
+            await tracker_bot.on_ready()
+        assert tracker_bot.phase == bot.BanTrackerBot.PHASE_NEW
+
+        with pytest.raises(RuntimeError):
+            await tracker_bot.on_ready()
+        return calls
+
+    assert asyncio.run(asyncio.wait_for(main(), 5)) == {"start_up": 2, "reconnected": 0}
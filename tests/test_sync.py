@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+import bot
+
+
+def test_run_command_sync_syncs_once(make_bot, monkeypatch):
+    tracker_bot = make_bot()
+    calls = []
+
+    async def sync_commands():
+        calls.append(True)
+
+    monkeypatch.setattr(tracker_bot, "sync_commands", sync_commands)
+    asyncio.run(asyncio.wait_for(tracker_bot.run_command_sync(), 5))
+    assert calls == [True]
+
+
+def test_run_command_sync_logs_failures(make_bot, monkeypatch, caplog):
+    tracker_bot = make_bot()
+
+    async def sync_commands():
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(tracker_bot, "sync_commands", sync_commands)
+    asyncio.run(asyncio.wait_for(tracker_bot.run_command_sync(), 5))
+    assert "Command sync failed: boom" in caplog.text
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int) -> None:
+        self.id = guild_id
+        self.name = f"guild {guild_id}"
+
+
+class FakeHttp:
+    def __init__(self) -> None:
+        self.global_payloads = []
+
+    async def bulk_upsert_global_commands(self, application_id, payload):
+        self.global_payloads.append(payload)
+
+
+@pytest.fixture
+def sync_bot(make_bot, monkeypatch):
+    def make(guild_ids, **config):
+        tracker_bot = make_bot(**config)
+        guilds = [FakeGuild(guild_id) for guild_id in guild_ids]
+        tracker_bot.synced = []
+
+        async def sync(guild=None):
+            tracker_bot.synced.append(guild.id if guild else 0)
+
+        monkeypatch.setattr(bot.BanTrackerBot, "guilds", property(lambda self: guilds))
+        monkeypatch.setattr(tracker_bot.tree, "sync", sync)
+        monkeypatch.setattr(tracker_bot.tree, "copy_global_to", lambda guild: None)
+        monkeypatch.setattr(tracker_bot.tree, "clear_commands", lambda guild: None)
+        tracker_bot.http = FakeHttp()
+        return tracker_bot
+    return make
+
+
+def test_sync_skips_guilds_with_unchanged_hash(sync_bot):
+    tracker_bot = sync_bot([1, 2])
+    asyncio.run(tracker_bot.sync_commands())
+    assert sorted(tracker_bot.synced) == [1, 2]
+
+    tracker_bot.synced.clear()
+    asyncio.run(tracker_bot.sync_commands())
+    assert tracker_bot.synced == []
+
+
+def test_sync_resyncs_guilds_with_outdated_hash(sync_bot):
+    tracker_bot = sync_bot([1, 2])
+    asyncio.run(tracker_bot.store.set_sync_hash(1, bot.command_schema_hash(tracker_bot.tree)))
+    asyncio.run(tracker_bot.store.set_sync_hash(2, "old"))
+    asyncio.run(tracker_bot.sync_commands())
+    assert tracker_bot.synced == [2]
+
+
+def test_switching_to_global_sync_clears_guild_commands(sync_bot):
+    tracker_bot = sync_bot([1, 2])
+    asyncio.run(tracker_bot.sync_commands())
+    tracker_bot.synced.clear()
+
+    tracker_bot.jsonconfig.config["global_command_sync"] = True
+    asyncio.run(tracker_bot.sync_commands())
+    # Both guild copies are cleared, then the commands are synced once globally
+    assert sorted(tracker_bot.synced) == [0, 1, 2]
+    assert set(tracker_bot.store.load_sync_hashes()) == {0}
+
+    tracker_bot.synced.clear()
+    asyncio.run(tracker_bot.sync_commands())
+    assert tracker_bot.synced == []
+
+
+def test_switching_back_to_guild_sync_drops_global_commands(sync_bot):
+    tracker_bot = sync_bot([1], global_command_sync=True)
+    asyncio.run(tracker_bot.sync_commands())
+    assert tracker_bot.synced == [0]
+
+    tracker_bot.synced.clear()
+    tracker_bot.jsonconfig.config["global_command_sync"] = False
+    asyncio.run(tracker_bot.sync_commands())
+    assert tracker_bot.http.global_payloads == [[]]
+    assert tracker_bot.synced == [1]
+    assert set(tracker_bot.store.load_sync_hashes()) == {1}
@@ -0,0 +1,89 @@
+import time
+import json
+import asyncio
+
+import pytest
+
+import bot
+
+URL = "https://discord.com/api/webhooks/1/token"
+
+
+class FakeWebhookResponse:
+    def __init__(self, status: int, body: str = "", headers: dict = None) -> None:
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    async def json(self, content_type=None):
+        return json.loads(self.body)
+
+    async def text(self):
+        return self.body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeWebhookSession:
+    def __init__(self, *responses: FakeWebhookResponse) -> None:
+        self.responses = list(responses)
+        self.posts = 0
+
+    def post(self, url, json=None, timeout=None):
+        assert timeout is not None
+        self.posts += 1
+        return self.responses.pop(0)
+
+
+def post(*responses: FakeWebhookResponse, max_retries: int = 3):
+    sink = bot.WebhookSink(max_retries=max_retries)
+    sink.session = FakeWebhookSession(*responses)
+    asyncio.run(asyncio.wait_for(sink.post(URL, "hello"), 5))
+    return sink
+
+
+def test_post_retries_after_json_rate_limit():
+    sink = post(
+        FakeWebhookResponse(429, '{"retry_after": 0.01, "global": false}'),
+        FakeWebhookResponse(204)
+    )
+    assert sink.session.posts == 2
+    assert sink.rate_limited == 1
+    assert URL not in sink.blocked_until
+
+
+def test_post_retries_after_rate_limit_without_json():
+    sink = post(
+        FakeWebhookResponse(429, "<html>Too many requests</html>", {"Retry-After": "0.01"}),
+        FakeWebhookResponse(204)
+    )
+    assert sink.session.posts == 2
+    assert sink.rate_limited == 1
+
+
+def test_global_rate_limit_blocks_every_webhook():
+    sink = post(FakeWebhookResponse(429, '{"retry_after": 0.01, "global": true}'), FakeWebhookResponse(204))
+    assert sink.global_blocked_until > 0
+    assert URL not in sink.blocked_until
+
+
+def test_exhausted_bucket_blocks_the_webhook():
+    sink = post(FakeWebhookResponse(204, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "5"}))
+    assert 4 < sink.blocked_until[URL] - time.monotonic() <= 5
+
+
+def test_missing_webhook_is_gone():
+    sink = bot.WebhookSink()
+    sink.session = FakeWebhookSession(FakeWebhookResponse(404, '{"message": "Unknown Webhook"}'))
+    with pytest.raises(bot.WebhookGone):
+        asyncio.run(sink.post(URL, "hello"))
+    assert sink.gone == {URL}
+
+
+def test_gives_up_after_repeated_rate_limits():
+    with pytest.raises(bot.WebhookError):
+        post(*[FakeWebhookResponse(429, '{"retry_after": 0.01}') for _ in range(3)], max_retries=2)